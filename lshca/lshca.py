@@ -12,6 +12,7 @@ from __future__ import division
 from __future__ import print_function
 import argparse
 import ctypes
+import errno
 import fcntl
 import hashlib
 import json
@@ -27,13 +28,121 @@ import subprocess
 import sys
 import tarfile
 import textwrap
+import threading
 import time
 
 
 try:
-    from StringIO import StringIO # for Python 2
+    from StringIO import StringIO # for Python 2, unlike io.StringIO accepts both str and unicode writes
 except ImportError:
-    from io import StringIO, BytesIO # for Python 3
+    from io import StringIO # for Python 3
+from io import BytesIO
+
+try:
+    from concurrent.futures import ThreadPoolExecutor
+except ImportError:
+    # Python 2 without the futures backport, devices are probed serially
+    ThreadPoolExecutor = None
+
+try:
+    import orjson
+except ImportError:
+    # Optional, used for faster JSON output when installed
+    orjson = None
+
+try:
+    from functools import lru_cache
+except ImportError:
+    # Python 2, results are not memoized
+    def lru_cache(maxsize=128):
+        def decorator(func):
+            return func
+        return decorator
+
+
+class _NoLock(object):
+    # Stand in for a lock where no locking is needed, Python 2 has no contextlib.nullcontext
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        return False
+
+_NO_LOCK = _NoLock()
+
+
+# Regex patterns used while probing every BDF, compiled once at module load
+_RE_LSPCI_BDF_LINE = re.compile(r'^0000:[0-9a-f]{2}:.*')
+_RE_BDF = re.compile(r"(.+) (Ethernet|Infini[Bb]and|Network)")
+_RE_DRIVER = re.compile(r'.*/([-_A-Za-z0-9]*)')
+_RE_VF_PARENT = re.compile(r".*/([0-9].*)")
+_RE_UPLNK_REPR = re.compile(r"^p\d+$")
+_RE_PF_REPR = re.compile(r"^pf\d+hpf$")
+_RE_VF_REPR = re.compile(r"^pf\d+vf\d+$")
+_RE_PORT_STATE = re.compile(r"[0-9:]+ (.*)")
+_RE_PORT_RATE = re.compile(r"([0-9\.]*) .*")
+_RE_PGUID = re.compile(r"((:[A-Fa-f0-9]{4}){4})$")
+_RE_IB_NET_PREFIX = re.compile(r"^(([A-Fa-f0-9]{4}:){4})")
+_RE_COLON = re.compile(r":")
+_RE_INET = re.compile(r"inet .+")
+_RE_INET6 = re.compile(r"inet6 .+")
+_RE_BOND_UPPER_DIR = re.compile(r"upper_.*")
+_RE_BOND_MASTER = re.compile(r"upper_(.*)$")
+_RE_SF_DIR = re.compile(r'mlx5_core\.sf\.[0-9]+')
+_RE_VIRTUAL_FUNCTION = re.compile(r".*[Vv]irtual [Ff]unction.*")
+_RE_LOSSLESS_BITMAP = re.compile(r'^[1_]+$')
+_RE_LOSSY_BITMAP = re.compile(r'^[0_]+$')
+_RE_DIGITS = re.compile(r'([0-9]+)')
+_RE_MST_BDF = re.compile(r"(?:[0-9a-fA-F]{4}:)?([0-9a-fA-F]{2}:[0-9a-fA-F]{2}\.[0-9a-fA-F])")
+_RE_MST_DEVICE = re.compile(r".* (/dev/mst/[^\s]+) .*")
+_RE_MST_DEVICE_SUFFIX = re.compile(r"/dev/mst/([^\s]+)")
+_RE_MST_CABLE = re.compile(r"([^\s/]+)_cable_[^\s]+")
+_RE_MST_DEVICE_FUNCTION = re.compile(r'(.*)\.[0-9]')
+_RE_SA_SYSTEM_GUID = re.compile(r".*SystemGuid.*")
+_RE_SA_NODE_DESCRIPTION = re.compile(r".*Node *Description.*")
+_RE_SA_GUID = re.compile(r".*GUID.*")
+_RE_SA_VALUE = re.compile(r"\.+(.*)")
+_RE_HEX_VALUE = re.compile(r"0x(.*)")
+# Alternations with a named group per field, each output is scanned once for all of its fields
+_RE_CABLE_FIELDS = re.compile(r'(?P<length>Length .*:.*)|(?P<pn>Part number +:.*)|(?P<sn>Serial number +:.*)')
+_RE_CABLE_LENGTH = re.compile(r'Length .*:(.*)')
+_RE_CABLE_PN = re.compile(r'Part number +:(.*)')
+_RE_CABLE_SN = re.compile(r'Serial number +:(.*)')
+_RE_MLXCONFIG_FIELDS = re.compile(r'(?P<model>.*INTERNAL_CPU_MODEL.*)|(?P<page_supplier>.*INTERNAL_CPU_PAGE_SUPPLIER.*)|'
+                                  r'(?P<eswitch_manager>.*INTERNAL_CPU_ESWITCH_MANAGER.*)|(?P<ib_vport0>.*INTERNAL_CPU_IB_VPORT0.*)|'
+                                  r'(?P<offload_engine>.*INTERNAL_CPU_OFFLOAD_ENGINE.*)')
+_RE_MLXCONFIG_VALUE = re.compile(r'.*\((.*)\)')
+_RE_PRIVHOST_LEVEL_LINE = re.compile(r'^level +: [A-Z]+')
+_RE_PRIVHOST_LEVEL = re.compile(r'.*: ([A-Z]+)')
+_RE_QOS_TRUST = re.compile(r"Priority trust state: (.*)")
+_RE_QOS_PFC = re.compile(r'^\s+enabled\s+(([0-9]\s+)+)')
+_RE_QOS_FIELDS = re.compile(r'(?P<trust>Priority trust state: .*)|(?P<pfc>^\s+enabled\s+(?:[0-9]\s+)+)')
+_RE_TEMPR = re.compile(r'^([0-9]+)\s+$')
+_RE_OFED_VER = re.compile(r'.*MLNX_OFED_LINUX-(.*):.*')
+_RE_MODINFO_VER = re.compile(r'^version:\s+([0-9].*)')
+_RE_RSHIM_DEV = re.compile(r'rshim[0-9]+')
+_RE_RSHIM_DEV_NAME_LINE = re.compile(r'DEV_NAME.*')
+_RE_RSHIM_DEV_NAME = re.compile(r'DEV_NAME +(.*)')
+# Commands built only from these characters have no pipes, redirections, quoting or globs and run without a shell
+_RE_SHELL_FREE_CMD = re.compile(r"^[\w \t./:,@%+-]*$")
+_RE_JSON_INDENT = re.compile(r"^ +", re.MULTILINE)
+_RE_REGEX_SPECIAL_CHARS = re.compile(r"[.^$*+?{}\[\]\\|()]")
+_INT_DIGITS = {10: frozenset("0123456789"), 16: frozenset("0123456789abcdefABCDEF")}
+
+# lspci -vvv parsing, the data of a device is walked once and every line is matched only against fields not found yet
+# Each field is (name, search regex selecting the line, output regex extracting the value), first matching line wins
+_RE_LSPCI_HEADER = re.compile(r"^[0-9].*")
+_RE_LSPCI_ANY_FIELD = re.compile(r"\[(?:SN|PN|EC)\]|Lnk(?:Cap|Sta):.*(?:Width|Speed)|[Pp][Cc][Ii][Ee] *[Gg][Ee][Nn]")
+_LSPCI_FIELDS = (
+    ("sn", re.compile(r"\[SN\].*"), re.compile(r".*:(.+)")),
+    ("pn", re.compile(r"\[PN\].*"), re.compile(r".*:(.+)")),
+    ("revision", re.compile(r"\[EC\].*"), re.compile(r".*:(.+)")),
+    ("lnk_cap_width", re.compile(r"LnkCap:.*Width.*"), re.compile(r".*Width (x[0-9]+)")),
+    ("lnk_sta_width", re.compile(r"LnkSta:.*Width.*"), re.compile(r".*Width (x[0-9]+)")),
+    ("lnk_cap_speed", re.compile(r"LnkCap:.*Speed.*"), re.compile(r".*Speed ([0-9]+)")),
+    ("lnk_sta_speed", re.compile(r"LnkSta:.*Speed.*"), re.compile(r".*Speed ([0-9]+)")),
+    ("pci_gen", re.compile(r".*[Pp][Cc][Ii][Ee] *[Gg][Ee][Nn].*"), re.compile(r".*[Pp][Cc][Ii][Ee] *[Gg][Ee][Nn]([0-9]) +")),
+)
 
 
 class Config(object):
@@ -43,22 +152,23 @@ class Config(object):
 
         self.output_view = "system"
         self.output_order_general = {
-                    "system": ["Dev", "Desc", "PN", "PSID", "SN", "FW", "Driver", "PCI_addr", "RDMA", "Net", "Port", "Numa", "LnkStat",
+                    "system": ("Dev", "Desc", "PN", "PSID", "SN", "FW", "Driver", "PCI_addr", "RDMA", "Net", "Port", "Numa", "LnkStat",
                                "IpStat", "Link", "Rate", "SRIOV", "Parent_addr", "Tempr", "LnkCapWidth", "LnkStaWidth",
-                               "HCA_Type", "Bond", "BondState", "BondMiiStat"],
-                    "ib": ["Dev", "Desc", "PN", "PSID", "SN", "FW", "Driver", "RDMA", "Port", "Net", "Numa", "LnkStat", "IpStat",
-                           "VrtHCA", "PLid", "PGuid", "IbNetPref"],
-                    "roce": ["Dev", "Desc", "PN", "PSID", "SN", "FW", "Driver", "PCI_addr", "RDMA", "Net", "Port", "Numa", "LnkStat",
-                             "IpStat", "RoCEstat"],
-                    "cable": ["Dev", "Desc", "PN", "PSID", "SN", "FW", "Driver", "RDMA", "Net", "MST_device",  "CblPN", "CblSN", "CblLng",
-                              "PhyLinkStat", "PhyLnkSpd", "PhyAnalisys"],
-                    "traffic": ["Dev", "Desc", "PN", "PSID", "SN", "FW", "Driver", "RDMA", "Net", "TX_bps", "RX_bps", "PktSeqErr"],
-                    "lldp": ["Dev", "Desc", "PN", "PSID", "SN", "FW", "Driver", "PCI_addr", "RDMA", "Net", "Port", "Numa", "LnkStat",
-                             "IpStat", "LLDPportId", "LLDPsysName", "LLDPmgmtAddr", "LLDPsysDescr"],
-                    "dpu": ["Dev", "Desc", "PN", "PSID", "SN", "FW", "Driver", "PCI_addr", "RDMA", "Port", "Net", "DPUmode",
-                            "BFBver", "RshimDev", "OvsBrdg", "LnkStat", "IpStat", "UplnkRepr", "PfRepr", "VfRepr", "SRIOV"]
+                               "HCA_Type", "Bond", "BondState", "BondMiiStat"),
+                    "ib": ("Dev", "Desc", "PN", "PSID", "SN", "FW", "Driver", "RDMA", "Port", "Net", "Numa", "LnkStat", "IpStat",
+                           "VrtHCA", "PLid", "PGuid", "IbNetPref"),
+                    "roce": ("Dev", "Desc", "PN", "PSID", "SN", "FW", "Driver", "PCI_addr", "RDMA", "Net", "Port", "Numa", "LnkStat",
+                             "IpStat", "RoCEstat"),
+                    "cable": ("Dev", "Desc", "PN", "PSID", "SN", "FW", "Driver", "RDMA", "Net", "MST_device",  "CblPN", "CblSN", "CblLng",
+                              "PhyLinkStat", "PhyLnkSpd", "PhyAnalisys"),
+                    "traffic": ("Dev", "Desc", "PN", "PSID", "SN", "FW", "Driver", "RDMA", "Net", "TX_bps", "RX_bps", "PktSeqErr"),
+                    "lldp": ("Dev", "Desc", "PN", "PSID", "SN", "FW", "Driver", "PCI_addr", "RDMA", "Net", "Port", "Numa", "LnkStat",
+                             "IpStat", "LLDPportId", "LLDPsysName", "LLDPmgmtAddr", "LLDPsysDescr"),
+                    "dpu": ("Dev", "Desc", "PN", "PSID", "SN", "FW", "Driver", "PCI_addr", "RDMA", "Port", "Net", "DPUmode",
+                            "BFBver", "RshimDev", "OvsBrdg", "LnkStat", "IpStat", "UplnkRepr", "PfRepr", "VfRepr", "SRIOV")
         }
-        self.output_order = self.output_order_general[self.output_view]
+        # Canonical orders are immutable, output_order is a copy since fields can be added while probing devices
+        self.output_order = list(self.output_order_general[self.output_view])
         self.show_warnings_and_errors = True
         self.colour_warnings_and_errors = True
         self.warning_sign = "*"
@@ -190,12 +300,12 @@ class Config(object):
             self.output_view = "all"
 
         if self.output_view != "all":
-            self.output_order = self.output_order_general[self.output_view]
+            self.output_order = list(self.output_order_general[self.output_view])
         else:
             i = 0
             for view in self.output_order_general:
                 if i == 0:
-                    self.output_order = self.output_order_general[view]
+                    self.output_order = list(self.output_order_general[view])
                 else:
                     for key in self.output_order_general[view]:
                         if key not in self.output_order:
@@ -222,6 +332,22 @@ class Config(object):
 
         self.colour_warnings_and_errors = args.colour
 
+    def is_field_requested(self, field):
+        # type: (str) -> bool
+        # Field can be displayed or filtered on, data needed only by such fields can be skipped otherwise
+        if field in self.output_order or field in self.output_fields_filter_positive:
+            return True
+        return any(filter_item.split("=")[0] == field for filter_item in self.where_output_filter)
+
+    def add_output_fields(self, fields):
+        # type: (list) -> None
+        # Fields that are added on demand, depending on the probed devices
+        existing_fields = set(self.output_order)
+        for field in fields:
+            if field not in existing_fields:
+                self.output_order.append(field)
+                existing_fields.add(field)
+
     def extended_help(self):
         # type: () -> None
         extended_help = textwrap.dedent("""
@@ -377,59 +503,67 @@ class HCAManager(object):
         self._config = config
         self._data_source = data_source
         self.mlnxHCAs = [] # type: list[MlnxHCA]
+        # Lookup tables for HCA attach, first HCA created with a given key wins
+        self._hca_by_sys_image_guid = {} # type: dict[str, MlnxHCA]
+        self._hca_by_sn = {} # type: dict[str, MlnxHCA]
+        # RoCE view only, default RoCE ToS per RDMA device read up front
+        self._rdma_cm_tos = None # type: dict[str, str]
 
     def get_data(self):
         # type: () -> None
         mlnx_bdf_list = []
-        # Same lspci cmd used in MST source in order to benefit from cache
-        data = self._data_source.exec_shell_cmd("lspci -vvvDnnd 15b3:", use_cache=True)
-        raw_mlnx_bdf_list = find_in_list(data, r'^0000:[0-9a-f]{2}:.*', return_only_first_group=False)
-        for member in raw_mlnx_bdf_list:
-            bdf = extract_string_by_regex(member, "(.+) (Ethernet|Infini[Bb]and|Network)")
+        # Same lspci records used by PCI devices, only the header line of each record has to be checked
+        for lspci_record in self._data_source.get_lspci_records():
+            if not _RE_LSPCI_BDF_LINE.match(lspci_record[0]):
+                continue
+            bdf = extract_string_by_regex(lspci_record[0], _RE_BDF)
 
             if bdf != "=N/A=":
                 mlnx_bdf_list.append(bdf)
 
-        mlnx_bdf_devices = [] # type: list[MlnxBDFDevice]
-        for bdf in mlnx_bdf_list:
-            port_count = 1
-
-            while True:
-                bdf_dev = MlnxBDFDevice(bdf, self._data_source, self._config, port_count)
-                bdf_dev.get_data()
-                mlnx_bdf_devices.append(bdf_dev)
+        # Bring up MST service before devices are probed, instead of checking it from every BDF device.
+        # MST service is stopped by MSTDevice objects, without devices there would be nothing to stop it
+        if mlnx_bdf_list and self._config.output_view in ("cable", "dpu", "all"):
+            MSTDevice.init_mst_service(self._data_source)
 
-                for sf in bdf_dev.sf_list:
-                    sf_dev = MlnxBDFDevice(bdf, self._data_source, self._config, port_count, sf=sf)
-                    sf_dev.get_data()
-                    mlnx_bdf_devices.append(sf_dev)
+        if self._config.output_view in ("roce", "all"):
+            rdma_list = [self._data_source.list_dir_if_exists("/sys/bus/pci/devices/" + bdf + "/infiniband/").rstrip()
+                         for bdf in mlnx_bdf_list]
+            roce_tos_reader = RoceTosReader(self._data_source)
+            roce_tos_reader.get_data([rdma for rdma in rdma_list if rdma])
+            self._rdma_cm_tos = roce_tos_reader.rdma_cm_tos
 
+        mlnx_bdf_devices = [] # type: list[MlnxBDFDevice]
+        for bdf_devices in self._map_parallel(self._get_bdf_devices, mlnx_bdf_list):
+            mlnx_bdf_devices.extend(bdf_devices)
 
-                if port_count >= len(bdf_dev.port_list):
-                    break
+        # Only first slave interface in a bond has infiniband information on his sysfs
+        rdma_bond_slaves = [bdf_dev for bdf_dev in mlnx_bdf_devices
+                            if bdf_dev.bond_master != "=N/A=" and bdf_dev.bond_master != "ovs-system" and bdf_dev.rdma != ""]
+        rdma_bond_bdfs = self._map_parallel(self._get_rdma_bond_device, rdma_bond_slaves)
+        for bdf_dev, rdma_bond_bdf in zip(rdma_bond_slaves, rdma_bond_bdfs):
+            bdf_dev.rdma_bond_device = rdma_bond_bdf
 
-                port_count += 1
+        # SA/SMP query fields are displayed only if any of the devices was queried
+        if any(bdf_dev.has_sasmp_data for bdf_dev in mlnx_bdf_devices + rdma_bond_bdfs):
+            self._config.add_output_fields(["SMGuid", "SwGuid", "SwDescription"])
 
         # First handle all PFs
         for bdf_dev in mlnx_bdf_devices:
-            rdma_bond_bdf = None
-
-            # Only first slave interface in a bond has infiniband information on his sysfs
-            if bdf_dev.bond_master != "=N/A=" and bdf_dev.bond_master != "ovs-system" and bdf_dev.rdma != "" :
-                rdma_bond_bdf = MlnxRdmaBondDevice(bdf_dev.bdf, self._data_source, self._config)
-                rdma_bond_bdf.get_data()
+            rdma_bond_bdf = bdf_dev.rdma_bond_device
 
             if bdf_dev.sriov in ("PF", "PF" + self._config.warning_sign, "SF"):
-                hca_found = False
-                for hca in self.mlnxHCAs:
-                    if hca.sys_image_guid and bdf_dev.sys_image_guid == hca.sys_image_guid or \
-                      bdf_dev.sn == hca.sn:
-                        hca_found = True
-                        if rdma_bond_bdf:
-                            hca.add_bdf_dev(rdma_bond_bdf)
-                        hca.add_bdf_dev(bdf_dev)
+                hca = None
+                if bdf_dev.sys_image_guid:
+                    hca = self._hca_by_sys_image_guid.get(bdf_dev.sys_image_guid)
+                if hca is None:
+                    hca = self._hca_by_sn.get(bdf_dev.sn)
 
-                if not hca_found:
+                if hca is not None:
+                    if rdma_bond_bdf:
+                        hca.add_bdf_dev(rdma_bond_bdf)
+                    hca.add_bdf_dev(bdf_dev)
+                else:
                     if rdma_bond_bdf:
                         hca = MlnxHCA(rdma_bond_bdf, self._config, self._data_source)
                         hca.add_bdf_dev(bdf_dev)
@@ -437,6 +571,8 @@ class HCAManager(object):
                         hca = MlnxHCA(bdf_dev,  self._config, self._data_source)
                     hca.hca_index = len(self.mlnxHCAs) + 1
                     self.mlnxHCAs.append(hca)
+                    self._hca_by_sys_image_guid.setdefault(hca.sys_image_guid, hca)
+                    self._hca_by_sn.setdefault(hca.sn, hca)
 
                 if not hca.hca_data_retrieved:
                     hca.get_data(bdf_dev)
@@ -446,29 +582,74 @@ class HCAManager(object):
 
 
         # Now handle all VFs
+        bdf_index = {} # type: dict[str, MlnxBDFDevice]
         for bdf_dev in mlnx_bdf_devices:
-            if bdf_dev.sriov == 'VF':
-                vf_parent_bdf = bdf_dev.vfParent
-
-                # TBD: refactor to function
-                for parent_bdf_dev in mlnx_bdf_devices:
-                    parent_found = False
-                    if vf_parent_bdf == parent_bdf_dev.bdf:
-                        parent_found = True
+            bdf_index.setdefault(bdf_dev.bdf, bdf_dev)
 
-                        hca = self._get_hca_by_sys_image_guid(parent_bdf_dev.sys_image_guid)
-                        if hca is not None:
-                            hca.add_bdf_dev(bdf_dev)
-                        else:
-                            raise Exception("VF " + str(bdf_dev) + " This device has no parent PF")
+        for bdf_dev in mlnx_bdf_devices:
+            if bdf_dev.sriov == 'VF':
+                parent_bdf_dev = bdf_index.get(bdf_dev.vfParent)
+                if parent_bdf_dev is None:
+                    continue
 
-                    if parent_found:
-                        break
+                hca = self._get_hca_by_sys_image_guid(parent_bdf_dev.sys_image_guid)
+                if hca is not None:
+                    hca.add_bdf_dev(bdf_dev)
+                else:
+                    raise Exception("VF " + str(bdf_dev) + " This device has no parent PF")
 
         if self._config.show_warnings_and_errors:
             for hca in self.mlnxHCAs:
                 hca.check_for_issues()
 
+    def _get_bdf_devices(self, bdf):
+        # type: (str) -> list[MlnxBDFDevice]
+        bdf_devices = []
+        # PCI and MST data is the same for all ports and SFs of the BDF, thus retrieved once and shared
+        pci_device = PCIDevice(bdf, self._data_source, self._config)
+        mst_device = MSTDevice(self._data_source, self._config)
+
+        for port in range(1, self._get_port_count(bdf) + 1):
+            bdf_dev = MlnxBDFDevice(bdf, self._data_source, self._config, port,
+                                    pci_device=pci_device, mst_device=mst_device, rdma_cm_tos=self._rdma_cm_tos)
+            bdf_dev.get_data()
+            bdf_devices.append(bdf_dev)
+
+            for sf in bdf_dev.sf_list:
+                sf_dev = MlnxBDFDevice(bdf, self._data_source, self._config, port, sf=sf,
+                                       pci_device=pci_device, mst_device=mst_device, rdma_cm_tos=self._rdma_cm_tos)
+                sf_dev.get_data()
+                bdf_devices.append(sf_dev)
+
+        return bdf_devices
+
+    def _get_rdma_bond_device(self, bdf_dev):
+        # type: (MlnxBDFDevice) -> MlnxRdmaBondDevice
+        rdma_bond_bdf = MlnxRdmaBondDevice(bdf_dev.bdf, self._data_source, self._config, rdma_cm_tos=self._rdma_cm_tos)
+        rdma_bond_bdf.get_data()
+        return rdma_bond_bdf
+
+    def _get_port_count(self, bdf):
+        # type: (str) -> int
+        # Same sysfs entries SYSFSDevice lists for port_list, BDF without RDMA device is handled as single port
+        sys_prefix = "/sys/bus/pci/devices/" + bdf
+        rdma = self._data_source.list_dir_if_exists(sys_prefix + "/infiniband/").rstrip()
+        if not rdma:
+            return 1
+
+        port_list = self._data_source.list_dir_entries(sys_prefix + "/infiniband/" + rdma + "/ports/")
+        return len(port_list) or 1
+
+    def _map_parallel(self, func, items):
+        # type: (callable, list) -> list
+        # Probing is mostly waiting on sysfs and external tools, so devices are handled by a thread pool.
+        # Results keep the order of items. LLDP capture relies on signals, which work only in the main thread
+        if ThreadPoolExecutor is None or len(items) < 2 or self._config.output_view in ("lldp", "all"):
+            return [func(item) for item in items]
+
+        with ThreadPoolExecutor(max_workers=min(32, len(items))) as executor:
+            return list(executor.map(func, items))
+
     def display_hcas_info(self):
         # type: () -> None
         out = Output(self._config, self._data_source)
@@ -480,13 +661,12 @@ class HCAManager(object):
 
     def _get_hca_by_sys_image_guid(self, sys_image_guid):
         # type: (str) -> MlnxHCA
-        for hca in self.mlnxHCAs:
-            if sys_image_guid == hca.sys_image_guid:
-                return hca
-        return None
+        return self._hca_by_sys_image_guid.get(sys_image_guid)
 
 
 class Output(object):
+    elastic_output_bdf_fields = ("SRIOV", "LnkStaWidth", "Port", "LnkStat", "Bond", "PhyAnalisys", "Link")
+
     def __init__(self, config, data_source):
         # type: (Config, DataSource) -> None
         self.config = config
@@ -497,6 +677,7 @@ class Output(object):
         self.separator_len = 0
         self.output_filter = {}
         self.output_order = self.config.output_order
+        self._order_set = frozenset(self.output_order)
 
     def append(self, data):
         self.output.append(data)
@@ -506,27 +687,29 @@ class Output(object):
         if len(self.config.output_fields_filter_positive) > 0:
             self.output_order = self.config.output_fields_filter_positive
         elif len(self.config.output_fields_filter_negative) > 0:
-            decrement_list = self.output_order
-
-            output_filter = self.config.output_fields_filter_negative
-            for item in output_filter:
-                if item in self.output_order:
-                    decrement_list.remove(item)
-
-            self.output_order = decrement_list
-
-        data_keys_remove_list = []
-        if len(self.output) > 0:
-            output_data_keys = list(self.output[0]) + list(self.output[0]["bdf_devices"][0])
-            data_keys_remove_list = list(set(output_data_keys) - set(self.output_order))
+            # New list, output order is shared with the config
+            output_filter = set(self.config.output_fields_filter_negative)
+            self.output_order = [item for item in self.output_order if item not in output_filter]
+        self._order_set = frozenset(self.output_order)
+
+        hca_keep_keys = self._order_set.union(["bdf_devices"])
+        # JSON output always carries the full BDF device records, only the HCA level fields are filtered
+        bdf_keep_keys = None
+        if self.config.output_format == "human_readable":
+            bdf_keep_keys = set(self._order_set)
+            if self.config.output_format_elastic:
+                # Elastic output decides which columns to hide based on these fields, even if they are not displayed
+                bdf_keep_keys.update(self.elastic_output_bdf_fields)
 
+        filtered_output = []
         for hca in self.output:
-            for key in data_keys_remove_list:
-                if key == "bdf_devices":
-                    continue
-                hca.pop(key, None)
-            for bdf_device in hca["bdf_devices"]:
-                bdf_device.pop(key, None)
+            hca_data = {key: value for key, value in hca.items() if key in hca_keep_keys}
+            if bdf_keep_keys is not None:
+                hca_data["bdf_devices"] = [{key: value for key, value in bdf_device.items() if key in bdf_keep_keys}
+                                           for bdf_device in hca["bdf_devices"]]
+            filtered_output.append(hca_data)
+
+        self.output = filtered_output
 
     def apply_where_output_filters(self):
         # type: () -> None
@@ -542,31 +725,31 @@ class Output(object):
             output_filter[f_list[0]] = f_list[1]
 
         for filter_key in output_filter:
+            filter_value = output_filter[filter_key]
+            if not _RE_REGEX_SPECIAL_CHARS.search(filter_value):
+                # Plain string, matching from the beginning of the field is a prefix check
+                output_filter[filter_key] = lambda value, prefix=filter_value: value.startswith(prefix)
+                continue
             try:
-                output_filter[filter_key] = re.compile(output_filter[filter_key])
+                output_filter[filter_key] = re.compile(filter_value).match
             except sre_constants.error:
-                print("Error: Invalid pattern \"%s\" passed to output filter " % output_filter[filter_key])
+                print("Error: Invalid pattern \"%s\" passed to output filter " % filter_value)
                 sys.exit(1)
 
-        for filter_key in output_filter:
-            remove_hca_list = []
-            for hca in self.output:
-                remove_bdf_list = []
-                for bdf_device in hca["bdf_devices"]:
-                    if filter_key in bdf_device and not re.match(output_filter[filter_key],
-                                                                 bdf_device[filter_key]):
-                        remove_bdf_list.append(bdf_device)
+        filters = list(output_filter.items())
 
-                for bdf_device in remove_bdf_list:
-                    hca["bdf_devices"].remove(bdf_device)
+        # Single pass, BDF device or HCA is kept only if it matches all filters for the fields it has
+        filtered_output = []
+        for hca in self.output:
+            hca["bdf_devices"] = [bdf_device for bdf_device in hca["bdf_devices"]
+                                  if all(filter_key not in bdf_device or match(bdf_device[filter_key])
+                                         for filter_key, match in filters)]
 
-                if len(hca["bdf_devices"]) == 0 or \
-                        filter_key in hca and not \
-                        re.match(output_filter[filter_key], hca[filter_key]):
-                    remove_hca_list.append(hca)
+            if hca["bdf_devices"] and all(filter_key not in hca or match(hca[filter_key])
+                                          for filter_key, match in filters):
+                filtered_output.append(hca)
 
-            for hca in remove_hca_list:
-                self.output.remove(hca)
+        self.output = filtered_output
 
     def elastic_output(self):
         # type: () -> None
@@ -691,50 +874,38 @@ class Output(object):
         # type: () -> None
         # function calculates self.column_width values and self.separator_len
 
+        order_set = self._order_set
+        column_width = self.column_width
+
         # first pass: collect all of the maximum widths for each of the BDF fields
         hca_field_line_width = 0
         for hca in self.output:
-            for key in hca:
-                if key == "bdf_devices":
-                    for bdf_device in hca["bdf_devices"]:
-                        for bdf_key in bdf_device:
-                            if bdf_key in self.output_order:
-                                # decide what is longer the key name or it's value
-                                if len(bdf_device[bdf_key]) > len(bdf_key):
-                                    width = len(bdf_device[bdf_key])
-                                else:
-                                    width = len(bdf_key)
-
-                                if bdf_key not in self.column_width:
-                                    self.column_width[bdf_key] = width
-
-                                if width > self.column_width[bdf_key]:
-                                    self.column_width[bdf_key] = width
+            for bdf_device in hca["bdf_devices"]:
+                for bdf_key, value in bdf_device.items():
+                    if bdf_key in order_set:
+                        # decide what is longer the key name or it's value
+                        width = max(len(value), len(bdf_key))
+                        if width > column_width.get(bdf_key, 0):
+                            column_width[bdf_key] = width
 
         # second pass: calculate width of BDF and HCA lines
         for hca in self.output:
-            curr_hca_column_width = {}
-            for key in hca:
-                if key == "bdf_devices":
-                    for bdf_device in hca["bdf_devices"]:
-                        for bdf_key in bdf_device:
-                            if bdf_key in self.output_order:
-                                curr_hca_column_width[bdf_key] = self.column_width[bdf_key]
-                        # It's enough to loop over single BDF to set field width
-                        break
-                else:
+            for key, value in hca.items():
+                if key != "bdf_devices":
                     # The +2 is for ': ' in HCA spesific fields
                     # The +1 is for '^ ' indentation in HCA spesific fields
                     # The +1 is for the looks
-                    current_width = len(key) + len(str(hca[key])) + 2 + 1 + 1
-                    if hca_field_line_width < current_width:
-                        hca_field_line_width = current_width
+                    hca_field_line_width = max(hca_field_line_width, len(key) + len(str(value)) + 2 + 1 + 1)
 
+            # It's enough to loop over single BDF to set field width
+            curr_hca_column_width = []
+            if hca["bdf_devices"]:
+                curr_hca_column_width = [column_width[bdf_key] for bdf_key in hca["bdf_devices"][0] if bdf_key in order_set]
 
             # width summary of all the fields +
             # number of all fields multipplied by number of padding charactes between them
             # The +1 is for the looks
-            bdf_device_line_width = sum(curr_hca_column_width.values()) + (len(curr_hca_column_width) - 1 ) * 3 + 1
+            bdf_device_line_width = sum(curr_hca_column_width) + (len(curr_hca_column_width) - 1 ) * 3 + 1
             self.separator_len = max(self.separator_len, bdf_device_line_width, hca_field_line_width)
 
     def print_output(self):
@@ -764,19 +935,38 @@ class Output(object):
         # type: () -> None
         self.separator = self.config.output_separator_char * self.separator_len
 
-        print(self.separator)
+        # The whole table is buffered and written at once
+        output_lines = [self.separator]
         for hca in self.output:
-            self.print_hca_header(hca)
-            print(self.separator)
-            self.print_bdf_devices(hca["bdf_devices"])
-            print(self.separator)
+            output_lines.extend(self.format_hca_header(hca))
+            output_lines.append(self.separator)
+            output_lines.extend(self.format_bdf_devices(hca["bdf_devices"]))
+            output_lines.append(self.separator)
+
+        sys.stdout.write("\n".join(output_lines) + "\n")
 
     def print_output_json(self):
         # type: () -> None
-        print(json.dumps(self.output, indent=4, sort_keys=True))
+        print(self.dump_json(self.output))
 
-    def print_hca_header(self, args):
-        # type: (dict) -> None
+    @staticmethod
+    def dump_json(data):
+        # type: (object) -> str
+        # orjson output is converted to be identical to json.dumps(indent=4, sort_keys=True)
+        if orjson is not None:
+            try:
+                json_output = orjson.dumps(data, option=orjson.OPT_SORT_KEYS | orjson.OPT_INDENT_2).decode("ascii")
+            except (TypeError, UnicodeDecodeError):
+                # Non string keys or non ASCII data, json module escapes the latter
+                json_output = None
+
+            if json_output is not None:
+                return _RE_JSON_INDENT.sub(lambda indent: indent.group(0) * 2, json_output)
+
+        return json.dumps(data, indent=4, sort_keys=True)
+
+    def format_hca_header(self, args):
+        # type: (dict) -> list
         order_dict = {}
 
         position = 0
@@ -794,15 +984,13 @@ class Output(object):
                 else:
                     prefix = " "
                     suffix = ": "
-                output_list = output_list[0:order_dict[key]] + \
-                              [prefix + str(key) + suffix + str(self.colour_warnings_and_errors(args[key]))] + \
-                              output_list[order_dict[key] + 1:]
+                output_list[order_dict[key]] = prefix + str(key) + suffix + str(self.colour_warnings_and_errors(args[key]))
 
-        if output_list:
-            print('\n'.join(output_list))
+        return output_list
 
-    def print_bdf_devices(self, args):
-        # type: (list) -> None
+    def format_bdf_devices(self, args):
+        # type: (list) -> list
+        output_lines = []
         count = 1
         order_dict = {}
 
@@ -817,27 +1005,27 @@ class Output(object):
             if count == 1:
                 for key in line:
                     if key in order_dict:
-                        output_list = output_list[0:order_dict[key]] + \
-                                      [str("{0:^{width}}".format(key, width=self.column_width[key]))] + \
-                                      output_list[order_dict[key] + 1:]
-                print(' | '.join(output_list))
-                print(self.separator)
+                        output_list[order_dict[key]] = str("{0:^{width}}".format(key, width=self.column_width[key]))
+                output_lines.append(' | '.join(output_list))
+                output_lines.append(self.separator)
 
             for key in line:
                 if key in order_dict:
                     field_value = str("{0:^{width}}".format(line[key], width=self.column_width[key]))
                     field_value = self.colour_warnings_and_errors(field_value)
-                    output_list = output_list[0:order_dict[key]] + [field_value] + \
-                                   output_list[order_dict[key] + 1:]
+                    output_list[order_dict[key]] = field_value
 
             count += 1
-            print(' | '.join(output_list))
+            output_lines.append(' | '.join(output_list))
+
+        return output_lines
 
 
 class MSTDevice(object):
     mst_tool_missing = False
     mst_service_initialized = False
     mst_service_should_be_stopped = False
+    _mst_service_lock = threading.Lock()
 
     def __init__(self, data_source, config):
         # type: (DataSource, Config) -> None
@@ -858,25 +1046,33 @@ class MSTDevice(object):
         # type: () -> str
         return self._mst_raw_data
 
-    def init_mst_service(self):
-        # type: () -> None
+    @staticmethod
+    def init_mst_service(data_source):
+        # type: (DataSource) -> None
+        # MST service is host wide, its state is kept in class attributes and resolved only once
+        with MSTDevice._mst_service_lock:
+            MSTDevice._init_mst_service(data_source)
+
+    @staticmethod
+    def _init_mst_service(data_source):
+        # type: (DataSource) -> None
         if MSTDevice.mst_service_initialized or MSTDevice.mst_tool_missing:
             return
 
-        result = self._data_source.exec_shell_cmd("which mst &> /dev/null ; echo $?", use_cache=True)
+        result = data_source.exec_shell_cmd("which mst &> /dev/null ; echo $?", use_cache=True)
         if result == ["0"]:
             mst_installed = True
         else:
             mst_installed = False
 
         if mst_installed:
-            result = self._data_source.exec_shell_cmd("mst status | grep -c 'MST PCI configuration module loaded'", use_cache=True)
+            result = data_source.exec_shell_cmd("mst status | grep -c 'MST PCI configuration module loaded'", use_cache=True)
             if int(result[0]) == 0:
-                self._data_source.exec_shell_cmd("mst start", use_cache=True)
+                data_source.exec_shell_cmd("mst start", use_cache=True)
                 MSTDevice.mst_service_should_be_stopped = True
-            self._data_source.exec_shell_cmd("mst cable add", use_cache=True)
+            data_source.exec_shell_cmd("mst cable add", use_cache=True)
         else:
-            self._data_source.log.info("MST tool is missing")
+            data_source.log.info("MST tool is missing")
             # Disable further use.access to mst device
             MSTDevice.mst_tool_missing = True
 
@@ -889,18 +1085,17 @@ class MSTDevice(object):
 
         mst_device_suffix = "None"
         self._mst_raw_data = self._data_source.exec_shell_cmd("mst status -v", use_cache=True)
-        bdf_short = extract_string_by_regex(bdf, "0000:(.+)")
-        if bdf_short == "=N/A=":
+        mst_devices_by_bdf, mst_cables_by_suffix = self._data_source.get_mst_status_data()
+        # mst shows BDFs of the default PCI domain without the domain part
+        if bdf.startswith("0000:"):
+            bdf_short = bdf[len("0000:"):]
+        else:
             bdf_short = bdf
 
-        for line in self._mst_raw_data:
-            data_line = extract_string_by_regex(line, "(.*" + bdf_short + ".*)")
-
-            if data_line != "=N/A=":
-                self.mst_device = extract_string_by_regex(data_line, r".* (/dev/mst/[^\s]+) .*")
-                mst_device_suffix = extract_string_by_regex(data_line, r"/dev/mst/([^\s]+)")
+        if bdf_short in mst_devices_by_bdf:
+            self.mst_device, mst_device_suffix = mst_devices_by_bdf[bdf_short]
 
-        self.mst_cable = find_in_list(self._mst_raw_data, r"({}_cable_[^\s]+)".format(mst_device_suffix)).strip()
+        self.mst_cable = mst_cables_by_suffix.get(mst_device_suffix, "")
 
 
 class PCIDevice(object):
@@ -909,23 +1104,31 @@ class PCIDevice(object):
         self._bdf = bdf
         self._config = config
         self._data_source = data_source
+        self.data_retrieved = False
 
     def get_data(self):
         # type: () -> None
+        if self.data_retrieved:
+            return
+        self.data_retrieved = True
+
         self._data = self._data_source.get_bdf_data_from_lspci(self._bdf)
+        lspci_info = self.parse_lspci_data(self._data)
+
         # Handling following string, taking reset of string after HCA type
         # 0000:01:00.0 Infiniband controller: Mellanox Technologies MT27700 Family [ConnectX-4]
-        self.description = self.get_info_from_lspci_data("^[0-9].*", str(self._bdf) + "[^:]+: (.+?)(?= \[[a-f0-9]{4}:[a-f0-9]{4}\]|$)")
-        self.sn = self.get_info_from_lspci_data("\[SN\].*", ".*:(.+)")
-        self._pn = self.get_info_from_lspci_data("\[PN\].*", ".*:(.+)")
-        self.revision = self.get_info_from_lspci_data("\[EC\].*", ".*:(.+)")
-        self._lnkCapWidth = self.get_info_from_lspci_data("LnkCap:.*Width.*", ".*Width (x[0-9]+)")
-        self._lnkStaWidth = self.get_info_from_lspci_data("LnkSta:.*Width.*", ".*Width (x[0-9]+)")
-        self._lnkCapSpeed = self.get_info_from_lspci_data("LnkCap:.*Speed.*", ".*Speed ([0-9]+)")
-        self._lnkStaSpeed = self.get_info_from_lspci_data("LnkSta:.*Speed.*", ".*Speed ([0-9]+)")
-        self._pciGen = self.get_info_from_lspci_data(".*[Pp][Cc][Ii][Ee] *[Gg][Ee][Nn].*",
-                                            ".*[Pp][Cc][Ii][Ee] *[Gg][Ee][Nn]([0-9]) +")
-        self.pci_device_id = self.get_info_from_lspci_data("^[0-9].*", str(self._bdf) + ".*\[([a-f0-9]{4}:[a-f0-9]{4})\]")
+        self.description = extract_string_by_regex(lspci_info["header"], str(self._bdf) +
+                                                   "[^:]+: (.+?)(?= \[[a-f0-9]{4}:[a-f0-9]{4}\]|$)").strip()
+        self.pci_device_id = extract_string_by_regex(lspci_info["header"], str(self._bdf) +
+                                                     ".*\[([a-f0-9]{4}:[a-f0-9]{4})\]").strip()
+        self.sn = lspci_info["sn"]
+        self._pn = lspci_info["pn"]
+        self.revision = lspci_info["revision"]
+        self._lnkCapWidth = lspci_info["lnk_cap_width"]
+        self._lnkStaWidth = lspci_info["lnk_sta_width"]
+        self._lnkCapSpeed = lspci_info["lnk_cap_speed"]
+        self._lnkStaSpeed = lspci_info["lnk_sta_speed"]
+        self._pciGen = lspci_info["pci_gen"]
 
         # self._pciGen and below speed IF statements here for backward compatibility of regression
         # they can be safely removed if all recorded sources will contain Speed
@@ -945,10 +1148,8 @@ class PCIDevice(object):
         elif self._lnkCapSpeed != self._lnkStaSpeed and self._config.show_warnings_and_errors is True:
             self.lnkStaWidth = str(self.lnkStaWidth) + self._config.warning_sign
 
-        self._inside_dpu = False
-        root_device_made_by_mellanox = self._data_source.get_bdf_data_from_lspci("0000:00:00.0")
-        if root_device_made_by_mellanox:
-            self._inside_dpu = True
+        # lspci data is shared by all the devices, only Mellanox devices are listed there
+        self._inside_dpu = bool(self._data_source.get_bdf_data_from_lspci("0000:00:00.0"))
 
     def __repr__(self):
         # type: () -> str
@@ -967,11 +1168,30 @@ class PCIDevice(object):
         else:
             return self._pn
 
-    def get_info_from_lspci_data(self, search_regex, output_regex):
-        # type: (re.Pattern, re.Pattern) -> str
-        search_result = find_in_list(self._data, search_regex)
-        search_result = extract_string_by_regex(search_result, output_regex)
-        return str(search_result).strip()
+    @staticmethod
+    def parse_lspci_data(lspci_data):
+        # type: (list) -> dict
+        # Single pass over the lspci output of a device, see _LSPCI_FIELDS
+        header = ""
+        found_lines = {}
+        for line in lspci_data:
+            if not header and _RE_LSPCI_HEADER.match(line):
+                header = line
+            if not _RE_LSPCI_ANY_FIELD.search(line):
+                continue
+            for field_name, search_regex, _ in _LSPCI_FIELDS:
+                if field_name not in found_lines:
+                    search_result = search_regex.search(line)
+                    if search_result:
+                        found_lines[field_name] = search_result.group(0)
+            if header and len(found_lines) == len(_LSPCI_FIELDS):
+                break
+
+        lspci_info = {"header": header}
+        for field_name, _, output_regex in _LSPCI_FIELDS:
+            lspci_info[field_name] = extract_string_by_regex(found_lines.get(field_name, ""), output_regex).strip()
+
+        return lspci_info
 
     @staticmethod
     def pci_speed_to_pci_gen(speed):
@@ -994,12 +1214,14 @@ class PCIDevice(object):
 
 
 class SYSFSDevice(object):
-    def __init__(self, bdf, data_source, config, port=1, sf=""):
-        # type: (str, DataSource, Config, int, str) -> None
+    def __init__(self, bdf, data_source, config, port=1, sf="", rdma_cm_tos=None):
+        # type: (str, DataSource, Config, int, str, dict) -> None
         self._bdf = bdf
         self._config = config
         self._data_source = data_source
         self._port = str(port)
+        # RoCE ToS of RDMA devices read in advance by RoceTosReader, missing ones are read by the device itself
+        self._rdma_cm_tos = rdma_cm_tos or {}
 
         self._sys_prefix = "/sys/bus/pci/devices/" + self._bdf
 
@@ -1033,7 +1255,7 @@ class SYSFSDevice(object):
     def get_data(self):
         # type: () -> None
         tmp = self._data_source.read_link_if_exists(self._sys_prefix + '/driver')
-        self.driver = extract_string_by_regex(tmp, '.*/([-_A-Za-z0-9]*)')
+        self.driver = extract_string_by_regex(tmp, _RE_DRIVER)
 
         self._data_source.log.debug("BDF:{} Port:{} SysFS path prefix:{}".format(self._bdf, self._port, self._sys_prefix ))
         if not self._data_source.list_dir_if_exists("{}/infiniband/".format(self._sys_prefix)) and \
@@ -1043,7 +1265,7 @@ class SYSFSDevice(object):
         vf_parent_file = self._data_source.read_link_if_exists(self._sys_prefix + "/physfn")
         if vf_parent_file != "":
             self.sriov = "VF"
-            self.vfParent = extract_string_by_regex(vf_parent_file, ".*\/([0-9].*)")
+            self.vfParent = extract_string_by_regex(vf_parent_file, _RE_VF_PARENT)
         else:
             self.sriov = "PF"
             self.vfParent = "-"
@@ -1062,29 +1284,21 @@ class SYSFSDevice(object):
         if not self.numa and not self.is_sf and self._config.in_use_by_vm_str not in self.rdma:
             print("Warning: " + self._bdf + " has no NUMA assignment", file=sys.stderr)
 
-        net_list = self._data_source.list_dir_if_exists(self._sys_prefix + "/net/")
+        net_list = self._data_source.list_dir_entries(self._sys_prefix + "/net/")
         self.net = ""
         self.uplnk_repr = ""
         self.pf_repr = ""
         self.vf_repr = ""
         matched_net_list = []
-        for net in net_list.split(" "):
+        for net in net_list:
             # the below code tries to identify which of the files has valid port number dev_id or dev_port
             # in mlx4 dev_port has the valid value, in mlx5 - dev_id
             # this solution mimics one in ibdev2netdev
 
             # Multiple network interfaces can be in mlx4 devices or in DPUs (representors)
-            net_port_dev_id = self._data_source.read_file_if_exists(self._sys_prefix + "/net/" + net + "/dev_id")
-            try:
-                net_port_dev_id = int(net_port_dev_id, 16)
-            except ValueError:
-                net_port_dev_id = 0
-
-            net_port_dev_port = self._data_source.read_file_if_exists(self._sys_prefix + "/net/" + net + "/dev_port")
-            try:
-                net_port_dev_port = int(net_port_dev_port)
-            except ValueError:
-                net_port_dev_port = 0
+            net_data = self._data_source.read_files_if_exist(self._sys_prefix + "/net/" + net, ["dev_id", "dev_port"])
+            net_port_dev_id = convert_to_int(net_data["dev_id"], 16)
+            net_port_dev_port = convert_to_int(net_data["dev_port"])
 
             if net_port_dev_id > net_port_dev_port:
                 net_port = net_port_dev_id
@@ -1094,86 +1308,69 @@ class SYSFSDevice(object):
             net_port += 1
 
             if str(net_port) == self._port:
-                if re.match(r"^p\d+$", net):
+                if _RE_UPLNK_REPR.match(net):
                     self.uplnk_repr = net
-                elif re.match(r"^pf\d+hpf$", net):
+                elif _RE_PF_REPR.match(net):
                     self.pf_repr = net
-                elif re.match(r"^pf\d+vf\d+$", net):
+                elif _RE_VF_REPR.match(net):
                     self.vf_repr = net
                 else:
                     matched_net_list.append(net)
 
         self.net = " ".join(matched_net_list)
 
-        self.hca_type = self._data_source.read_file_if_exists(self._sys_prefix + "/infiniband/" + self.rdma + "/hca_type").rstrip()
+        # RDMA device attributes are read in a single sweep
+        rdma_data = self._data_source.read_files_if_exist(self._sys_prefix + "/infiniband/" + self.rdma,
+                                                          ["hca_type", "fw_ver", "board_id", "sys_image_guid"])
+        self.hca_type = rdma_data["hca_type"].rstrip()
 
-        self.lnk_state = self._data_source.read_file_if_exists(self._sys_prefix + "/infiniband/" + self.rdma + "/ports/" +
-                                                         self._port + "/state")
-        self.lnk_state = extract_string_by_regex(self.lnk_state, "[0-9:]+ (.*)", "").lower()
+        # All port attributes are read in a single sweep, phys_state is needed only for ports that are down
+        port_prefix = self._sys_prefix + "/infiniband/" + self.rdma + "/ports/" + self._port
+        port_data = self._data_source.read_files_if_exist(port_prefix, ["state", "link_layer", "rate", "lid", "sm_lid",
+                                                                        "gids/0", "has_smi"])
+
+        self.lnk_state = extract_string_by_regex(port_data["state"], _RE_PORT_STATE, "").lower()
         if self.lnk_state == "active":
             self.lnk_state = "actv"
 
         if self.lnk_state == "down":
-            self.phys_state = self._data_source.read_file_if_exists(self._sys_prefix + "/infiniband/" + self.rdma +
-                                                          "/ports/" + self._port + "/phys_state")
-            self.phys_state = extract_string_by_regex(self.phys_state, "[0-9:]+ (.*)", "").lower()
+            self.phys_state = self._data_source.read_file_if_exists(port_prefix + "/phys_state")
+            self.phys_state = extract_string_by_regex(self.phys_state, _RE_PORT_STATE, "").lower()
 
             if self.phys_state == "polling":
                 self.lnk_state = "poll"
 
 
-        self.link_layer = self._data_source.read_file_if_exists(self._sys_prefix + "/infiniband/" + self.rdma +
-                                                          "/ports/" + self._port + "/link_layer")
-        self.link_layer = self.link_layer.rstrip()
+        self.link_layer = port_data["link_layer"].rstrip()
         if self.link_layer == "InfiniBand":
             self.link_layer = "IB"
         elif self.link_layer == "Ethernet":
             self.link_layer = "Eth"
 
-        self.fw = self._data_source.read_file_if_exists(self._sys_prefix + "/infiniband/" + self.rdma + "/fw_ver")
-        self.fw = self.fw.rstrip()
+        self.fw = rdma_data["fw_ver"].rstrip()
 
-        self.psid = self._data_source.read_file_if_exists(self._sys_prefix + "/infiniband/" + self.rdma + "/board_id")
-        self.psid = self.psid.rstrip()
+        self.psid = rdma_data["board_id"].rstrip()
 
-        self.port_rate = self._data_source.read_file_if_exists(self._sys_prefix + "/infiniband/" + self.rdma + "/ports/" +
-                                                         self._port + "/rate")
-        self.port_rate = extract_string_by_regex(self.port_rate, "([0-9\.]*) .*", "")
+        self.port_rate = extract_string_by_regex(port_data["rate"], _RE_PORT_RATE, "")
         if self.lnk_state == "down" and self._config.show_warnings_and_errors is True:
             self.port_rate = self.port_rate + self._config.warning_sign
 
-        self.port_list = self._data_source.list_dir_if_exists(self._sys_prefix + "/infiniband/" + self.rdma + "/ports/").rstrip()
-        self.port_list = self.port_list.split(" ")
+        self.port_list = self._data_source.list_dir_entries(self._sys_prefix + "/infiniband/" + self.rdma + "/ports/")
 
-        self.plid = self._data_source.read_file_if_exists(self._sys_prefix + "/infiniband/" + self.rdma +
-                                                    "/ports/" + self._port + "/lid")
-        try:
-            self.plid = int(self.plid, 16)
-        except ValueError:
-            self.plid = ""
-        self.plid = str(self.plid)
+        self.plid = str(convert_to_int(port_data["lid"], 16, ""))
 
-        self.smlid = self._data_source.read_file_if_exists(self._sys_prefix + "/infiniband/" + self.rdma +
-                                                     "/ports/" + self._port + "/sm_lid")
-        try:
-            self.smlid = int(self.smlid, 16)
-        except ValueError:
-            self.smlid = ""
-        self.smlid = str(self.smlid)
+        self.smlid = str(convert_to_int(port_data["sm_lid"], 16, ""))
 
-        full_guid = self._data_source.read_file_if_exists(self._sys_prefix + "/infiniband/" + self.rdma +
-                                                    "/ports/" + self._port + "/gids/0")
+        full_guid = port_data["gids/0"]
 
-        self.pguid = extract_string_by_regex(full_guid, "((:[A-Fa-f0-9]{4}){4})$", "").lower()
-        self.pguid = re.sub(':', '', self.pguid)
+        self.pguid = extract_string_by_regex(full_guid, _RE_PGUID, "").lower()
+        self.pguid = _RE_COLON.sub('', self.pguid)
 
-        self.ib_net_prefix = extract_string_by_regex(full_guid, "^(([A-Fa-f0-9]{4}:){4})", "").lower()
-        self.ib_net_prefix = re.sub(':', '', self.ib_net_prefix)
+        self.ib_net_prefix = extract_string_by_regex(full_guid, _RE_IB_NET_PREFIX, "").lower()
+        self.ib_net_prefix = _RE_COLON.sub('', self.ib_net_prefix)
 
-        self.has_smi = self._data_source.read_file_if_exists(self._sys_prefix + "/infiniband/" + self.rdma +
-                                                       "/ports/" + self._port + "/has_smi")
-        self.has_smi = self.has_smi.rstrip()
-        if ( self.link_layer != "IB" or re.match('mlx4', self.rdma) ) and (self._config.in_use_by_vm_str not in self.rdma):
+        self.has_smi = port_data["has_smi"].rstrip()
+        if ( self.link_layer != "IB" or self.rdma.startswith('mlx4') ) and (self._config.in_use_by_vm_str not in self.rdma):
             self.virt_hca = "N/A"
         elif self.has_smi == "0":
             self.virt_hca = "Virt"
@@ -1182,21 +1379,25 @@ class SYSFSDevice(object):
         else:
             self.virt_hca = ""
 
-        self.sys_image_guid = self._data_source.read_file_if_exists(self._sys_prefix + "/infiniband/" + self.rdma +
-                                                              "/sys_image_guid").rstrip()
+        self.sys_image_guid = rdma_data["sys_image_guid"].rstrip()
 
-        self.bond_mii_status = self._data_source.read_file_if_exists(self._sys_prefix + "/net/" + self.net +
-                                                              "/bonding_slave/mii_status").rstrip()
-        self.bond_state = self._data_source.read_file_if_exists(self._sys_prefix + "/net/" + self.net +
-                                                              "/bonding_slave/state").rstrip()
+        bond_slave_data = self._data_source.read_files_if_exist(self._sys_prefix + "/net/" + self.net + "/bonding_slave",
+                                                                ["mii_status", "state"])
+        self.bond_mii_status = bond_slave_data["mii_status"].rstrip()
+        self.bond_state = bond_slave_data["state"].rstrip()
 
-        self.operstate = self._data_source.read_file_if_exists("/sys/class/net/" + self.net + "/operstate").rstrip()
+        # Interface state is cached per interface, same interface can be queried by several devices (i.e. ports, bonds)
+        self.operstate = self._data_source.read_file_if_exists("/sys/class/net/" + self.net + "/operstate",
+                                                               use_cache=True).rstrip()
         self.ip_state = None
-        if self.operstate == "up":
+        if self.operstate == "up" and not self._config.is_field_requested("IpStat"):
+            # IP addresses are reported only by IpStat
+            self.ip_state = "up"
+        elif self.operstate == "up":
             # Implemented via shell cmd to avoid using non default libraries
-            interface_data = self._data_source.exec_shell_cmd(" ip address show dev %s" % self.net)
-            ipv4_data = find_in_list(interface_data, "inet .+")
-            ipv6_data = find_in_list(interface_data, "inet6 .+")
+            interface_data = self._data_source.exec_shell_cmd(" ip address show dev %s" % self.net, use_cache=True)
+            ipv4_data = find_in_list(interface_data, _RE_INET)
+            ipv6_data = find_in_list(interface_data, _RE_INET6)
             if ipv4_data and ipv6_data:
                 self.ip_state = "up_ip46"
             elif ipv4_data:
@@ -1213,9 +1414,9 @@ class SYSFSDevice(object):
         else:
             self.ip_state = "down"
 
-        tmp = self._data_source.list_dir_if_exists(self._sys_prefix + "/net/" + self.net).split(" ")
-        bond_master_dir = find_in_list(tmp, "upper_.*").rstrip()
-        self.bond_master = extract_string_by_regex(bond_master_dir, "upper_(.*)$")
+        tmp = self._data_source.list_dir_entries(self._sys_prefix + "/net/" + self.net)
+        bond_master_dir = find_in_list(tmp, _RE_BOND_UPPER_DIR).rstrip()
+        self.bond_master = extract_string_by_regex(bond_master_dir, _RE_BOND_MASTER)
 
         if self.ip_state == "down" and ( self.lnk_state == "actv" or self.bond_state ) \
                 and self._config.show_warnings_and_errors is True:
@@ -1231,21 +1432,15 @@ class SYSFSDevice(object):
         if self._config.output_view == "roce" or self._config.output_view == "all":
             self.gtclass = self._data_source.read_file_if_exists(self._sys_prefix + "/infiniband/" + self.rdma +
                                                            "/tc/1/traffic_class").rstrip()
-            self.tcp_ecn = self._data_source.read_file_if_exists("/proc/sys/net/ipv4/tcp_ecn").rstrip()
+            # tcp_ecn is host wide, no need to read it for every device
+            self.tcp_ecn = self._data_source.read_file_if_exists("/proc/sys/net/ipv4/tcp_ecn", use_cache=True).rstrip()
 
-            roce_tos_path_prefix = "/sys/kernel/config/rdma_cm/" + self.rdma
-            roce_tos_path_prefix_cleanup = False
-            try:
-                if self._data_source.list_dir_if_exists(roce_tos_path_prefix) == "":
-                    os.mkdir(roce_tos_path_prefix)
-                    roce_tos_path_prefix_cleanup = True
-                    self._data_source.list_dir_if_exists(roce_tos_path_prefix) # here to record dir if recording enabled
-                self.rdma_cm_tos = self._data_source.read_file_if_exists(roce_tos_path_prefix +
-                                                                   "/ports/1/default_roce_tos").rstrip()
-                if roce_tos_path_prefix_cleanup:
-                    os.rmdir(roce_tos_path_prefix)
-            except OSError:
-                self.rdma_cm_tos = "Failed to retrieve"
+            if self.rdma in self._rdma_cm_tos:
+                self.rdma_cm_tos = self._rdma_cm_tos[self.rdma]
+            else:
+                roce_tos_reader = RoceTosReader(self._data_source)
+                roce_tos_reader.get_data([self.rdma])
+                self.rdma_cm_tos = roce_tos_reader.rdma_cm_tos[self.rdma]
 
         self.traff_tx_bitps = "N/A"
         self.traff_rx_bitps = "N/A"
@@ -1253,8 +1448,8 @@ class SYSFSDevice(object):
 
         # Read the SF config only once
         if self._port == "1":
-            tmp = self._data_source.list_dir_if_exists(self._sys_prefix ).rstrip().split()
-            self.sf_list = find_in_list(tmp, r'mlx5_core\.sf\.[0-9]+', return_only_first_group=False)
+            tmp = self._data_source.list_dir_entries(self._sys_prefix)
+            self.sf_list = find_in_list(tmp, _RE_SF_DIR, return_only_first_group=False)
             if not self.sf_list:
                 self.sf_list = []
         else:
@@ -1325,6 +1520,41 @@ class SYSFSDevice(object):
             pass
 
 
+class RoceTosReader(object):
+    def __init__(self, data_source):
+        # type: (DataSource) -> None
+        self._data_source = data_source
+
+        self.rdma_cm_tos = {} # type: dict[str, str]
+
+    def get_data(self, rdma_list):
+        # type: (list) -> None
+        # rdma_cm configfs directory has to be created in order to read the default RoCE ToS.
+        # Directories of all RDMA devices are created first and removed only after all of them were read
+        created_dirs = []
+        try:
+            for rdma in rdma_list:
+                if rdma in self.rdma_cm_tos:
+                    continue
+
+                roce_tos_path_prefix = "/sys/kernel/config/rdma_cm/" + rdma
+                try:
+                    if self._data_source.list_dir_if_exists(roce_tos_path_prefix) == "":
+                        os.mkdir(roce_tos_path_prefix)
+                        created_dirs.append(roce_tos_path_prefix)
+                        self._data_source.list_dir_if_exists(roce_tos_path_prefix) # here to record dir if recording enabled
+                    self.rdma_cm_tos[rdma] = self._data_source.read_file_if_exists(roce_tos_path_prefix +
+                                                                                   "/ports/1/default_roce_tos").rstrip()
+                except OSError:
+                    self.rdma_cm_tos[rdma] = "Failed to retrieve"
+        finally:
+            for roce_tos_path_prefix in created_dirs:
+                try:
+                    os.rmdir(roce_tos_path_prefix)
+                except OSError:
+                    self._data_source.log.debug("Failed to remove " + roce_tos_path_prefix)
+
+
 class SaSmpQueryDevice(object):
     def __init__(self,  data_source, config):
         # type: (DataSource, Config) -> None
@@ -1341,30 +1571,31 @@ class SaSmpQueryDevice(object):
         self._rdma = rdma
         self._smlid = smlid
 
-        if "SMGuid" not in self._config.output_order:
-            self._config.output_order.append("SMGuid")
-        if "SwGuid" not in self._config.output_order:
-            self._config.output_order.append("SwGuid")
-        if "SwDescription" not in self._config.output_order:
-            self._config.output_order.append("SwDescription")
-
-        self.sw_guid = ''
+        # The queries are independent, thus executed concurrently
+        cmds = []
         if virt_hca == "Phys":
-            self.data = self._data_source.exec_shell_cmd("smpquery -C " + self._rdma + " -P " + self._port + " NI -D  0,1")
-            self.sw_guid = self.get_info_from_sa_smp_query_data(".*SystemGuid.*", "\.+(.*)")
-            self.sw_guid = extract_string_by_regex(self.sw_guid, "0x(.*)")
+            cmds.append("smpquery -C " + self._rdma + " -P " + self._port + " NI -D  0,1")
+            cmds.append("smpquery -C " + self._rdma + " -P " + self._port + " ND -D  0,1")
+        if lnk_state != "init":
+            cmds.append("saquery SMIR -C " + self._rdma + " -P " + self._port + " " + self._smlid)
+        cmds_output = dict(zip(cmds, self._data_source.exec_shell_cmds(cmds)))
 
+        self.sw_guid = ''
         self.sw_description = ''
         if virt_hca == "Phys":
-            self.data = self._data_source.exec_shell_cmd("smpquery -C " + self._rdma + " -P " + self._port + " ND -D  0,1")
-            self.sw_description = self.get_info_from_sa_smp_query_data(".*Node *Description.*", "\.+(.*)")
+            self.data = cmds_output[cmds[0]]
+            self.sw_guid = self.get_info_from_sa_smp_query_data(_RE_SA_SYSTEM_GUID, _RE_SA_VALUE)
+            self.sw_guid = extract_string_by_regex(self.sw_guid, _RE_HEX_VALUE)
+
+            self.data = cmds_output[cmds[1]]
+            self.sw_description = self.get_info_from_sa_smp_query_data(_RE_SA_NODE_DESCRIPTION, _RE_SA_VALUE)
 
         # Get SM lid
         self.sm_guid = ''
         if lnk_state != "init":
-            self.data = self._data_source.exec_shell_cmd("saquery SMIR -C " + self._rdma + " -P " + self._port + " " + self._smlid)
-            self.sm_guid = self.get_info_from_sa_smp_query_data(".*GUID.*", "\.+(.*)")
-            self.sm_guid = extract_string_by_regex(self.sm_guid, "0x(.*)")
+            self.data = cmds_output[cmds[-1]]
+            self.sm_guid = self.get_info_from_sa_smp_query_data(_RE_SA_GUID, _RE_SA_VALUE)
+            self.sm_guid = extract_string_by_regex(self.sm_guid, _RE_HEX_VALUE)
 
     def get_info_from_sa_smp_query_data(self, search_regex, output_regex):
         # type: (re.Pattern, re.Pattern) -> str
@@ -1387,9 +1618,12 @@ class MlxCable(object):
         if mst_cable == "":
             return
         data = self._data_source.exec_shell_cmd("mlxcables -d " + mst_cable, use_cache=True)
-        self.cable_length = search_in_list_and_extract_by_regex(data, r'Length .*:.*', r'Length .*:(.*)').replace(" ", "")
-        self.cable_pn = search_in_list_and_extract_by_regex(data, r'Part number +:.*', r'Part number +:(.*)').replace(" ", "")
-        self.cable_sn = search_in_list_and_extract_by_regex(data, r'Serial number +:.*', r'Serial number +:(.*)').replace(" ", "")
+        fields = search_in_list_and_extract_by_regexes(data, _RE_CABLE_FIELDS, {"length": _RE_CABLE_LENGTH,
+                                                                               "pn": _RE_CABLE_PN,
+                                                                               "sn": _RE_CABLE_SN})
+        self.cable_length = fields["length"].replace(" ", "")
+        self.cable_pn = fields["pn"].replace(" ", "")
+        self.cable_sn = fields["sn"].replace(" ", "")
 
 
 class MlxLink(object):
@@ -1444,14 +1678,16 @@ class MlxConfig(object):
 
         # all of MST devices on single HCA point to the same configuration source
         # this will reduce execution time
-        normalised_mst_device = re.sub(r'(.*)\.[0-9]', r'\1', mst_device)
+        normalised_mst_device = _RE_MST_DEVICE_FUNCTION.sub(r'\1', mst_device)
 
         data = self._data_source.exec_shell_cmd("mlxconfig -d {} q".format(normalised_mst_device), use_cache=True)
-        self.internal_cpu_model = search_in_list_and_extract_by_regex(data, r'.*INTERNAL_CPU_MODEL.*', r'.*\((.*)\)')
-        self.internal_cpu_page_supplier = search_in_list_and_extract_by_regex(data, r'.*INTERNAL_CPU_PAGE_SUPPLIER.*', r'.*\((.*)\)')
-        self.internal_cpu_eswitch_manager = search_in_list_and_extract_by_regex(data, r'.*INTERNAL_CPU_ESWITCH_MANAGER.*', r'.*\((.*)\)')
-        self.internal_cpu_cpu_ib_vport0 = search_in_list_and_extract_by_regex(data, r'.*INTERNAL_CPU_IB_VPORT0.*', r'.*\((.*)\)')
-        self.internal_cpu_offload_engine = search_in_list_and_extract_by_regex(data, r'.*INTERNAL_CPU_OFFLOAD_ENGINE.*', r'.*\((.*)\)')
+        fields = search_in_list_and_extract_by_regexes(data, _RE_MLXCONFIG_FIELDS,
+                                                       dict.fromkeys(_RE_MLXCONFIG_FIELDS.groupindex, _RE_MLXCONFIG_VALUE))
+        self.internal_cpu_model = fields["model"]
+        self.internal_cpu_page_supplier = fields["page_supplier"]
+        self.internal_cpu_eswitch_manager = fields["eswitch_manager"]
+        self.internal_cpu_cpu_ib_vport0 = fields["ib_vport0"]
+        self.internal_cpu_offload_engine = fields["offload_engine"]
 
 
 class MlxPrivHost(object):
@@ -1468,10 +1704,10 @@ class MlxPrivHost(object):
 
         # all of MST devices on single HCA point to the same configuration source
         # this will reduce execution time
-        normalised_mst_device = re.sub(r'(.*)\.[0-9]', r'\1', mst_device)
+        normalised_mst_device = _RE_MST_DEVICE_FUNCTION.sub(r'\1', mst_device)
 
         data = self._data_source.exec_shell_cmd("mlxprivhost -d {} q".format(normalised_mst_device), use_cache=True)
-        tmp = search_in_list_and_extract_by_regex(data, r'^level +: [A-Z]+', r'.*: ([A-Z]+)')
+        tmp = search_in_list_and_extract_by_regex(data, _RE_PRIVHOST_LEVEL_LINE, _RE_PRIVHOST_LEVEL)
         self.restric_level = tmp.lower()
 
 
@@ -1504,29 +1740,36 @@ class MiscCMDs(object):
         # type: (DataSource, Config) -> None
         self.data_source = data_source
         self.config = config
+        # Parsed mlnx_qos output per net, trust state and PFC are read from the same output
+        self._mlnx_qos = {}
+
+    def get_mlnx_qos(self, net):
+        # type: (str) -> tuple
+        # Returns (trust state, PFC) of the net
+        if net in self._mlnx_qos:
+            return self._mlnx_qos[net]
+
+        data = self.data_source.exec_shell_cmd("mlnx_qos -i " + net, use_cache=True)
+        search_result = find_in_list_by_groups(data, _RE_QOS_FIELDS)
+        trust = extract_string_by_regex(search_result.get("trust", ""), _RE_QOS_TRUST)
+        pfc = extract_string_by_regex(search_result.get("pfc", ""), _RE_QOS_PFC).replace(" ", "")
+
+        self._mlnx_qos[net] = (trust, pfc)
+        return self._mlnx_qos[net]
 
     def get_mlnx_qos_trust(self, net):
         # type: (str) -> str
-        data = self.data_source.exec_shell_cmd("mlnx_qos -i " + net, use_cache=True)
-        regex = "Priority trust state: (.*)"
-        search_result = find_in_list(data, regex)
-        search_result = extract_string_by_regex(search_result, regex)
-        return search_result
+        return self.get_mlnx_qos(net)[0]
 
     def get_mlnx_qos_pfc(self, net):
         # type: (str) -> str
-        data = self.data_source.exec_shell_cmd("mlnx_qos -i " + net, use_cache=True)
-        regex = '^\s+enabled\s+(([0-9]\s+)+)'
-        search_result = find_in_list(data, regex)
-        search_result = extract_string_by_regex(search_result, regex).replace(" ", "")
-        return search_result
+        return self.get_mlnx_qos(net)[1]
 
     def get_tempr(self, rdma):
         # type: (str) -> str
         data = self.data_source.exec_shell_cmd("mget_temp -d " + rdma, use_cache=True)
-        regex = '^([0-9]+)\s+$'
-        search_result = find_in_list(data, regex)
-        search_result = extract_string_by_regex(search_result, regex).replace(" ", "")
+        search_result = find_in_list(data, _RE_TEMPR)
+        search_result = extract_string_by_regex(search_result, _RE_TEMPR).replace(" ", "")
         try:
             if int(search_result) > 90:
                 return search_result + self.config.error_sign
@@ -1537,17 +1780,25 @@ class MiscCMDs(object):
             return "=N/A="
 
     def get_driver_ver(self):
+        # type: () -> str
+        # Driver version is the same for the whole host, thus identified once and reused by all HCAs
+        cache_key = "MiscCMDs.get_driver_ver"
+        with self.data_source.cache_lock(cache_key):
+            if cache_key not in self.data_source.cache:
+                self.data_source.cache[cache_key] = self._get_driver_ver()
+
+        return self.data_source.cache[cache_key]
+
+    def _get_driver_ver(self):
         # type: () -> str
         mofed_ver = str(self.data_source.exec_shell_cmd("ofed_info -s ", use_cache=True, report_cmd_error=False))
-        regex = '.*MLNX_OFED_LINUX-(.*):.*'
-        mofed_ver = extract_string_by_regex(mofed_ver, regex)
+        mofed_ver = extract_string_by_regex(mofed_ver, _RE_OFED_VER)
         if mofed_ver != "=N/A=":
             return "mlnx_ofed-" + mofed_ver
 
         inbox_ver = self.data_source.exec_shell_cmd("modinfo mlx5_cored", use_cache=True, report_cmd_error=False)
-        regex = '^version:\s+([0-9].*)'
-        search_result = find_in_list(inbox_ver, regex)
-        search_result = extract_string_by_regex(search_result, regex)
+        search_result = find_in_list(inbox_ver, _RE_MODINFO_VER)
+        search_result = extract_string_by_regex(search_result, _RE_MODINFO_VER)
         if search_result != self.config.na_str_extnd:
             return "inbox-" + str(search_result)
         else:
@@ -1565,24 +1816,32 @@ class MiscCMDs(object):
 
 
 class MlnxBDFDevice(object):
-    def __init__(self, bdf, data_source, config, port=1, sf=""):
-        # type: (str, DataSource, Config, int, str) -> None
+    def __init__(self, bdf, data_source, config, port=1, sf="", pci_device=None, mst_device=None, rdma_cm_tos=None):
+        # type: (str, DataSource, Config, int, str, PCIDevice, MSTDevice, dict) -> None
         self.bdf = bdf
         self._config = config
         self._data_source = data_source
 
-        self._sysFSDevice = SYSFSDevice(self.bdf, self._data_source, self._config, port, sf)
-        self._pciDevice = PCIDevice(self.bdf, self._data_source, self._config)
-        self._mstDevice = MSTDevice(self._data_source, self._config)
+        self._sysFSDevice = SYSFSDevice(self.bdf, self._data_source, self._config, port, sf, rdma_cm_tos)
+        # PCI and MST devices can be shared by BDF devices of the same BDF
+        if pci_device is None:
+            pci_device = PCIDevice(self.bdf, self._data_source, self._config)
+        self._pciDevice = pci_device
+        if mst_device is None:
+            mst_device = MSTDevice(self._data_source, self._config)
+        self._mstDevice = mst_device
         self._mlxLink = MlxLink(self._data_source)
         self._mlxCable = MlxCable(self._data_source)
         self._mlxConfig = MlxConfig(self._data_source)
         self._mlxPrivHost = MlxPrivHost(self._data_source)
         self._ovsVsctl = OvsVsctl(self._data_source)
         self._miscDevice = MiscCMDs(self._data_source, self._config)
-        self._sasmpQueryDevice = SaSmpQueryDevice(self._data_source, self._config)
+        # Created only for devices that are queried, see get_data
+        self._sasmpQueryDevice = None
         self._lldpData = LldpData(self._data_source, self._config)
         self._Rshim = RshimDevice(self.bdf, self._data_source, self._config)
+        # RDMA bond device, set by HCAManager on the bond slave that carries the bond infiniband information
+        self.rdma_bond_device = None # type: MlnxRdmaBondDevice
 
     def get_data(self):
         # type: () -> None
@@ -1640,10 +1899,7 @@ class MlnxBDFDevice(object):
         if self._config.output_view == "cable" or \
           self._config.output_view == "dpu" or \
           self._config.output_view == "all":
-            self._mstDevice.init_mst_service()
             self._mstDevice.get_data(self.bdf)
-            if self._config.output_view != "dpu" and "MST_device" not in self._config.output_order:
-                self._config.output_order.append("MST_device")
         self.mst_device = self._mstDevice.mst_device
         self.mst_cable = self._mstDevice.mst_cable
 
@@ -1680,10 +1936,15 @@ class MlnxBDFDevice(object):
 
         # ------ SA/SMP query ------
         if (self._config.output_view == "ib" or self._config.output_view == "all") and self.link_layer == "IB" and self.lnk_state != "down":
+            self._sasmpQueryDevice = SaSmpQueryDevice(self._data_source, self._config)
             self._sasmpQueryDevice.get_data(self.rdma, self.port, self.smlid, self.lnk_state, self.virt_hca)
-        self.sw_guid = self._sasmpQueryDevice.sw_guid
-        self.sw_description = self._sasmpQueryDevice.sw_description
-        self.sm_guid = self._sasmpQueryDevice.sm_guid
+            self.sw_guid = self._sasmpQueryDevice.sw_guid
+            self.sw_description = self._sasmpQueryDevice.sw_description
+            self.sm_guid = self._sasmpQueryDevice.sm_guid
+        else:
+            self.sw_guid = ""
+            self.sw_description = ""
+            self.sm_guid = ""
 
         # ------ Traffic ------
         if self._config.output_view == "traffic" or self._config.output_view == "all":
@@ -1743,11 +2004,17 @@ class MlnxBDFDevice(object):
     def sriov(self):
         # type: () -> str
         if self._config.show_warnings_and_errors is True and self._sysFSDevice.sriov == "PF" and \
-                re.match(r".*[Vv]irtual [Ff]unction.*", self._pciDevice.description):
+                _RE_VIRTUAL_FUNCTION.match(self._pciDevice.description):
             return self._sysFSDevice.sriov + self._config.warning_sign
         else:
             return self._sysFSDevice.sriov
 
+    @property
+    def has_sasmp_data(self):
+        # type: () -> bool
+        # SA/SMP queries run only for some of the devices, see get_data
+        return self._sasmpQueryDevice is not None
+
     @property
     def roce_status(self):
         # type: () -> str
@@ -1761,18 +2028,18 @@ class MlnxBDFDevice(object):
             bond_slave = True
 
         if type(self) != MlnxBDFDevice:
-            lossy_status_bitmap_str += "_"
-        elif self._miscDevice.get_mlnx_qos_trust(self.net) == self._config.lossless_roce_expected_trust:
-            lossy_status_bitmap_str += "1"
+            lossy_status_bitmap_str += "__"
         else:
-            lossy_status_bitmap_str += "0"
+            qos_trust, qos_pfc = self._miscDevice.get_mlnx_qos(self.net)
+            if qos_trust == self._config.lossless_roce_expected_trust:
+                lossy_status_bitmap_str += "1"
+            else:
+                lossy_status_bitmap_str += "0"
 
-        if type(self) != MlnxBDFDevice:
-            lossy_status_bitmap_str += "_"
-        elif self._miscDevice.get_mlnx_qos_pfc(self.net) == self._config.lossless_roce_expected_pfc:
-            lossy_status_bitmap_str += "1"
-        else:
-            lossy_status_bitmap_str += "0"
+            if qos_pfc == self._config.lossless_roce_expected_pfc:
+                lossy_status_bitmap_str += "1"
+            else:
+                lossy_status_bitmap_str += "0"
 
         if bond_slave:
             lossy_status_bitmap_str += "_"
@@ -1793,9 +2060,9 @@ class MlnxBDFDevice(object):
         else:
             lossy_status_bitmap_str += "0"
 
-        if re.compile('^[1_]+$').match(lossy_status_bitmap_str):
+        if _RE_LOSSLESS_BITMAP.match(lossy_status_bitmap_str):
             retval = "Lossless"
-        elif re.compile('^[0_]+$').match(lossy_status_bitmap_str):
+        elif _RE_LOSSY_BITMAP.match(lossy_status_bitmap_str):
             retval = "Lossy"
         else:
             retval = "Lossy:" + lossy_status_bitmap_str
@@ -1926,7 +2193,9 @@ class MlnxHCA(object):
         self.fw = bdf_dev.fw
         self.psid = bdf_dev.psid
         self.description = bdf_dev.description
-        self.tempr = bdf_dev._miscDevice.get_tempr(bdf_dev.rdma)
+        self.tempr = ""
+        if self.config.is_field_requested("Tempr"):
+            self.tempr = bdf_dev._miscDevice.get_tempr(bdf_dev.rdma)
         self.driver_ver = bdf_dev._miscDevice.get_driver_ver()
         self.bfb_ver = bdf_dev._miscDevice.get_bfb_version(bdf_dev._inside_dpu)
         self.dpu_mode = bdf_dev.dpu_mode
@@ -2002,7 +2271,7 @@ class MlnxRdmaBondDevice(MlnxBDFDevice):
 
     def _fix_rdma_bond(self):
         # type: () -> None
-        self.bdf = "rdma_" + re.sub(r'([0-9]+)', r'_\1' , self.bond_master)
+        self.bdf = "rdma_" + _RE_DIGITS.sub(r'_\1' , self.bond_master)
         self.net = self.bond_master
         self.bond_master = ""
         self.bond_mii_status = ""
@@ -2021,12 +2290,15 @@ class MlnxRdmaBondDevice(MlnxBDFDevice):
 
         sys_prefix = "/sys/devices/virtual/net/" + self.net
 
-        operstate = self._data_source.read_file_if_exists(sys_prefix + "/operstate").rstrip()
-        if operstate == "up":
+        operstate = self._data_source.read_file_if_exists(sys_prefix + "/operstate", use_cache=True).rstrip()
+        if operstate == "up" and not self._config.is_field_requested("IpStat"):
+            # IP addresses are reported only by IpStat
+            self.ip_state = "up"
+        elif operstate == "up":
             # Implemented via shell cmd to avoid using non default libraries
-            interface_data = self._data_source.exec_shell_cmd(" ip address show dev %s" % self.net)
-            ipv4_data = find_in_list(interface_data, "inet .+")
-            ipv6_data = find_in_list(interface_data, "inet6 .+")
+            interface_data = self._data_source.exec_shell_cmd(" ip address show dev %s" % self.net, use_cache=True)
+            ipv4_data = find_in_list(interface_data, _RE_INET)
+            ipv6_data = find_in_list(interface_data, _RE_INET6)
             if ipv4_data and ipv6_data:
                 self.ip_state = "up_ip46"
             elif ipv4_data:
@@ -2046,9 +2318,10 @@ class MlnxRdmaBondDevice(MlnxBDFDevice):
         if self.ip_state == "up_noip" and self._config.show_warnings_and_errors is True:
             self.ip_state = self.ip_state + self._config.warning_sign
 
-        mode = self._data_source.read_file_if_exists(sys_prefix + "/bonding/mode").rstrip()
+        bonding_data = self._data_source.read_files_if_exist(sys_prefix + "/bonding", ["mode", "xmit_hash_policy", "slaves"])
+        mode = bonding_data["mode"].rstrip()
         mode = mode.split(" ")[0]
-        xmit_hash_policy = self._data_source.read_file_if_exists(sys_prefix + "/bonding/xmit_hash_policy").rstrip()
+        xmit_hash_policy = bonding_data["xmit_hash_policy"].rstrip()
         xmit_hash_policy = xmit_hash_policy.split(" ")[0]
         xmit_hash_policy = xmit_hash_policy.replace("layer","l")
         xmit_hash_policy = xmit_hash_policy.replace("encap","e")
@@ -2058,7 +2331,7 @@ class MlnxRdmaBondDevice(MlnxBDFDevice):
             self.bond_state = self.bond_state + "/" + xmit_hash_policy
 
         # Slaves speed check
-        slaves = self._data_source.read_file_if_exists(sys_prefix + "/bonding/slaves").rstrip().split(" ")
+        slaves = bonding_data["slaves"].rstrip().split(" ")
         bond_speed = ""
         bond_speed_missmatch = False
         for slave in slaves:
@@ -2213,8 +2486,8 @@ class RshimDevice(object):
         self.rshim_dev = ""
 
     def get_data(self):
-        dev_list = self._data_source.list_dir_if_exists('/dev')
-        rshim_list = find_in_list(dev_list.split(' '),r'rshim[0-9]+',return_only_first_group=False)
+        dev_list = self._data_source.list_dir_entries('/dev')
+        rshim_list = find_in_list(dev_list, _RE_RSHIM_DEV, return_only_first_group=False)
 
         if not rshim_list:
             self._data_source.log.error('Missing /dev RSHIM devices for {}. Check if driver loaded'.format(self._bdf))
@@ -2224,7 +2497,7 @@ class RshimDevice(object):
             curr_rshim_dev = '/dev/{}'.format(rshim)
             curr_rshim_dev_misc = '{}/misc'.format(curr_rshim_dev)
             misc_data = self._data_source.read_file_if_exists(curr_rshim_dev_misc,use_cache=True)
-            dev_name = search_in_list_and_extract_by_regex(misc_data.split('\n'),r'DEV_NAME.*',r'DEV_NAME +(.*)')
+            dev_name = search_in_list_and_extract_by_regex(misc_data.split('\n'), _RE_RSHIM_DEV_NAME_LINE, _RE_RSHIM_DEV_NAME)
             if self._config.na_str in dev_name:
                 self._data_source.log.error('Failed to read {}. DEV_NAME is missing'.format(curr_rshim_dev_misc))
                 return
@@ -2254,18 +2527,21 @@ class DataSource(object):
         self.cache = {}
         self.config = config
         self.interfaces_struct = []
+        self._cache_locks = {}
+        self._cache_locks_lock = threading.Lock()
+        self._tar_lock = threading.Lock()
 
         self.logging_stream = sys.stderr
         if self.config.record_data_for_debug is True:
             if not os.path.exists(self.config.record_dir):
                 os.makedirs(self.config.record_dir)
 
-            self.config.record_tar_file = "%s/%s--%s--%s--v%s.tar" % (self.config.record_dir, os.uname()[1], str(self.config.output_view).upper(),
+            self.config.record_tar_file = "%s/%s--%s--%s--v%s.tar.gz" % (self.config.record_dir, os.uname()[1], str(self.config.output_view).upper(),
                                                                   str(time.time()), self.config.ver)
 
-            print("\nlshca started data recording")
-            print("output saved in " + self.config.record_tar_file + " file\n")
-            self.tar = tarfile.open(name=self.config.record_tar_file, mode='a')
+            sys.stdout.write("\nlshca started data recording\noutput saved in " + self.config.record_tar_file + " file\n\n")
+            # Streaming mode, members are compressed and written out as they are recorded
+            self.tar = tarfile.open(name=self.config.record_tar_file, mode='w|gz')
 
             self.stdout = StringIO()
             sys.stdout = self.stdout
@@ -2307,40 +2583,62 @@ class DataSource(object):
             self.tar.close()
 
 
+    def cache_lock(self, cache_key, use_cache=True):
+        # Devices are probed in parallel, per key lock makes sure cached data is retrieved only once
+        if use_cache is not True:
+            return _NO_LOCK
+
+        with self._cache_locks_lock:
+            return self._cache_locks.setdefault(cache_key, threading.Lock())
+
     def exec_shell_cmd(self, cmd, use_cache=False, splitlines=True, report_cmd_error=True):
         # type: (str, bool, bool, bool) -> list
         timeout = 10
-        cache_key = self.cmd_to_str(cmd)
+        cache_key = cmd
 
-        if use_cache is True and cache_key in self.cache:
-            output = self.cache[cache_key]
-            error = ""
-        else:
-            # using shell timeout, because python subprocess timeout requres Python 3.3+
-            cmd_with_timeout = "timeout {} {}".format(timeout, cmd)
-            process = subprocess.Popen(cmd_with_timeout,
-                                    stdout=subprocess.PIPE,
-                                    stderr=subprocess.PIPE,
-                                    shell=True,
-                                    executable="/bin/bash")
-            output, error = process.communicate()
-            if process.returncode == 124:
-                # report_cmd_error not used here because timeout is an issue that should be always reported,
-                # but missing cmd that returs an error might be acceptable
-                self.log.error('Following cmd failed due to timeout of {}s.\n\tCMD: {}'.format(timeout, cmd))
-            if error:
-                if isinstance(error, bytes):
-                    error = error.decode()
-                error = re.sub(r'timeout: ', '', error.strip())
-                if report_cmd_error:
-                    self.log.error('Following cmd returned and error message.\n\tCMD: {}\n\tMsg: {}'.format(cmd, error))
-            if isinstance(output, bytes):
-                output = output.decode('utf8')
+        with self.cache_lock(cache_key, use_cache):
+            cache_hit = use_cache is True and cache_key in self.cache
+            if cache_hit:
+                output = self.cache[cache_key]
+                error = ""
+            else:
+                argv = split_shell_free_cmd(cmd)
+                if argv is not None and sys.version_info >= (3, 3):
+                    # Plain cmd and arguments, neither bash nor the timeout utility are needed in order to run it
+                    output, error, returncode = self._exec_argv(list(argv), timeout)
+                else:
+                    # using shell timeout, because python subprocess timeout requres Python 3.3+
+                    if argv is not None:
+                        process = subprocess.Popen(["timeout", str(timeout)] + list(argv),
+                                                stdout=subprocess.PIPE,
+                                                stderr=subprocess.PIPE)
+                    else:
+                        cmd_with_timeout = "timeout {} {}".format(timeout, cmd)
+                        process = subprocess.Popen(cmd_with_timeout,
+                                                stdout=subprocess.PIPE,
+                                                stderr=subprocess.PIPE,
+                                                shell=True,
+                                                executable="/bin/bash")
+                    output, error = process.communicate()
+                    returncode = process.returncode
+                if returncode == 124:
+                    # report_cmd_error not used here because timeout is an issue that should be always reported,
+                    # but missing cmd that returs an error might be acceptable
+                    self.log.error('Following cmd failed due to timeout of {}s.\n\tCMD: {}'.format(timeout, cmd))
+                if error:
+                    if isinstance(error, bytes):
+                        error = error.decode()
+                    error = re.sub(r'timeout: ', '', error.strip())
+                    if report_cmd_error:
+                        self.log.error('Following cmd returned and error message.\n\tCMD: {}\n\tMsg: {}'.format(cmd, error))
+                if isinstance(output, bytes):
+                    output = output.decode('utf8')
 
-            if use_cache is True:
-                self.cache.update({cache_key: output})
+                if use_cache is True:
+                    self.cache.update({cache_key: output})
 
-        if self.config.record_data_for_debug is True:
+        # Cached data was recorded when it was retrieved
+        if self.config.record_data_for_debug is True and not cache_hit:
             cmd = "shell.cmd/" + cmd
             self.record_data(cmd, output, error)
 
@@ -2349,33 +2647,105 @@ class DataSource(object):
 
         return output
 
-    def get_bdf_data_from_lspci(self, bdf, use_cache=True):
-        # type: (str, bool) -> dict
+    @staticmethod
+    def _exec_argv(argv, timeout):
+        # type: (list, int) -> tuple
+        # Python 3.3+ only. Returns (output, error, returncode), failures are reported the way the timeout utility does
+        try:
+            # Own process group, so the whole cmd tree can be killed on timeout. Many of the tools are wrapper scripts
+            process = subprocess.Popen(argv, stdout=subprocess.PIPE, stderr=subprocess.PIPE, start_new_session=True)
+        except OSError as exception:
+            return b"", "failed to run command '{}': {}".format(argv[0], exception.strerror), 127
+
+        try:
+            output, error = process.communicate(timeout=timeout)
+        except subprocess.TimeoutExpired:
+            try:
+                os.killpg(process.pid, signal.SIGKILL)
+            except OSError:
+                # Process group already gone
+                pass
+            output, error = process.communicate()
+            return output, error, 124
+
+        return output, error, process.returncode
+
+    def get_lspci_records(self, use_cache=True):
+        # type: (bool) -> list
+        # All Mellanox devices are retrieved by a single lspci cmd, output is split into per device records.
+        # Each record is a list of lines, the first one is the device header
         cmd = "lspci -vvvDnnd 15b3:"
 
-        lspci_dict_cache_key = self.cmd_to_str(cmd + "lspci_dictionary")
-        if use_cache is True and lspci_dict_cache_key in self.cache:
-            d_output = self.cache[lspci_dict_cache_key]
-        else:
-            lspci_cache_key = self.cmd_to_str(cmd)
-            if use_cache is True and lspci_cache_key in self.cache:
-                data = self.cache[lspci_cache_key]
+        lspci_records_cache_key = cmd + "lspci_records"
+        with self.cache_lock(lspci_records_cache_key, use_cache):
+            if use_cache is True and lspci_records_cache_key in self.cache:
+                l_output = self.cache[lspci_records_cache_key]
             else:
                 data = self.exec_shell_cmd(cmd, use_cache=True, splitlines=False)
+                l_output = [raw_bdf.splitlines() for raw_bdf in data.strip().split("\n\n") if raw_bdf]
 
                 if use_cache is True:
-                    self.cache.update({lspci_cache_key: data})
+                    self.cache.update({lspci_records_cache_key: l_output})
 
-            l_output = data.strip().split("\n\n")
+        return l_output
 
-            d_output = {}
-            for raw_bdf in l_output:
-                d_output[raw_bdf.split(" ")[0]] = raw_bdf
+    def exec_shell_cmds(self, cmds, use_cache=False):
+        # type: (list, bool) -> list
+        # Independent cmds executed concurrently, each one via exec_shell_cmd. Outputs are in the order of cmds
+        if ThreadPoolExecutor is None or len(cmds) < 2:
+            return [self.exec_shell_cmd(cmd, use_cache=use_cache) for cmd in cmds]
 
-            if use_cache is True:
-                self.cache.update({lspci_dict_cache_key: d_output})
+        with ThreadPoolExecutor(max_workers=len(cmds)) as executor:
+            return list(executor.map(lambda cmd: self.exec_shell_cmd(cmd, use_cache=use_cache), cmds))
+
+    def get_bdf_data_from_lspci(self, bdf, use_cache=True):
+        # type: (str, bool) -> list
+        cmd = "lspci -vvvDnnd 15b3:"
+
+        lspci_dict_cache_key = cmd + "lspci_dictionary"
+        with self.cache_lock(lspci_dict_cache_key, use_cache):
+            if use_cache is True and lspci_dict_cache_key in self.cache:
+                d_output = self.cache[lspci_dict_cache_key]
+            else:
+                d_output = {}
+                for lspci_record in self.get_lspci_records(use_cache):
+                    d_output[lspci_record[0].split(" ")[0]] = lspci_record
+
+                if use_cache is True:
+                    self.cache.update({lspci_dict_cache_key: d_output})
+
+        return d_output.get(bdf, [])
+
+    def get_mst_status_data(self, use_cache=True):
+        # type: (bool) -> tuple
+        # "mst status -v" output parsed once for all the devices into two tables:
+        # {bdf: (mst device, mst device suffix)}, the last line listing the bdf wins
+        # {mst device suffix: cable}, the first listed cable wins
+        cmd = "mst status -v"
+
+        mst_tables_cache_key = cmd + "mst_tables"
+        with self.cache_lock(mst_tables_cache_key, use_cache):
+            if use_cache is True and mst_tables_cache_key in self.cache:
+                output = self.cache[mst_tables_cache_key]
+            else:
+                mst_devices_by_bdf = {}
+                mst_cables_by_suffix = {}
+                for line in self.exec_shell_cmd(cmd, use_cache=True):
+                    for cable in _RE_MST_CABLE.finditer(line):
+                        mst_cables_by_suffix.setdefault(cable.group(1), cable.group(0))
+
+                    mst_device = None
+                    for bdf in _RE_MST_BDF.finditer(line):
+                        if mst_device is None:
+                            mst_device = (extract_string_by_regex(line, _RE_MST_DEVICE),
+                                          extract_string_by_regex(line, _RE_MST_DEVICE_SUFFIX))
+                        mst_devices_by_bdf[bdf.group(0)] = mst_device
+                        mst_devices_by_bdf[bdf.group(1)] = mst_device
+
+                output = (mst_devices_by_bdf, mst_cables_by_suffix)
+                if use_cache is True:
+                    self.cache.update({mst_tables_cache_key: output})
 
-        output = d_output.get(bdf, "").splitlines()
         return output
 
     def record_data(self, cmd, output, error=""):
@@ -2386,55 +2756,114 @@ class DataSource(object):
 
     def record_data_to_tar(self, file_name, data):
         # type: (str, str) -> None
-            p_data = pickle.dumps(data)
-
-            if sys.version_info.major == 3:
-                tar_contents = BytesIO(p_data)
-            else:
-                tar_contents = StringIO(p_data)
+            # Binary protocol that both Python 2 and 3 can load
+            p_data = pickle.dumps(data, protocol=2)
+            tar_contents = BytesIO(p_data)
 
             tarinfo = tarfile.TarInfo(file_name)
             tarinfo.size = len(p_data)
             tarinfo.mtime = time.time()
-            self.tar.addfile(tarinfo, tar_contents)
+            with self._tar_lock:
+                self.tar.addfile(tarinfo, tar_contents)
 
     def read_file_if_exists(self, file_to_read, record_suffix="", use_cache=False):
         # type: (str, str, bool) -> str
-        cache_key = self.cmd_to_str(str(file_to_read) + str(record_suffix))
+        return self._read_file(file_to_read, record_suffix, use_cache)
 
-        if use_cache is True and cache_key in self.cache:
-            output = self.cache[cache_key]
-        else:
-            if os.path.exists(file_to_read):
-                f = open(file_to_read, "r")
+    def _read_file(self, file_to_read, record_suffix="", use_cache=False, dir_fd=None, name=None):
+        # type: (str, str, bool, int, str) -> str
+        # If dir_fd is given, file_to_read is opened as name relative to it. file_to_read is still used for caching and recording
+        cache_key = str(file_to_read) + str(record_suffix)
+
+        with self.cache_lock(cache_key, use_cache):
+            cache_hit = use_cache is True and cache_key in self.cache
+            if cache_hit:
+                output = self.cache[cache_key]
+            else:
+                # Missing files are detected by open itself, saves a stat per read
                 try:
-                    output = f.read()
-                except (IOError, TypeError) as exception:
-                    print("Driver error: failed to read {}".format(file_to_read), file=sys.stderr)
+                    if dir_fd is not None:
+                        fd = os.open(name, os.O_RDONLY, dir_fd=dir_fd)
+                    else:
+                        fd = os.open(file_to_read, os.O_RDONLY)
+                except (IOError, OSError) as exception:
+                    if exception.errno not in (errno.ENOENT, errno.ENOTDIR):
+                        raise
+                    fd = None
+
+                if fd is None:
                     output = ""
-                except Exception as e:
-                    print("\n\nFailed to read file" + str(file_to_read) + "\n\n")
-                    raise
-                f.close()
-            else:
-                output = ""
+                else:
+                    try:
+                        output = self._read_fd(fd)
+                    except (IOError, OSError, TypeError) as exception:
+                        print("Driver error: failed to read {}".format(file_to_read), file=sys.stderr)
+                        output = ""
+                    except Exception as e:
+                        print("\n\nFailed to read file" + str(file_to_read) + "\n\n")
+                        raise
+                    finally:
+                        os.close(fd)
 
-            if use_cache is True:
-                self.cache.update({cache_key: output})
+                if use_cache is True:
+                    self.cache.update({cache_key: output})
 
-        if self.config.record_data_for_debug is True:
+        if self.config.record_data_for_debug is True and not cache_hit:
             cmd = "os.path.exists" + file_to_read + record_suffix
             self.record_data(cmd, output)
 
         return output
 
+    def read_files_if_exist(self, dir_to_read, files_to_read):
+        # type: (str, list) -> dict
+        # Reads a group of files located under the same directory, i.e. all attributes of a sysfs port.
+        # Caching and data recording are the same as in read_file_if_exists
+        output = {}
+        dir_fd = None
+        # Subclasses overriding read_file_if_exists (i.e. debug data replay) keep receiving every file read
+        if os.open in getattr(os, "supports_dir_fd", ()) and not self._is_overridden("read_file_if_exists"):
+            # The directory is resolved once, its files are opened relative to it
+            try:
+                dir_fd = os.open(dir_to_read, getattr(os, "O_PATH", os.O_RDONLY) | os.O_DIRECTORY)
+            except OSError:
+                dir_fd = None
+
+        if dir_fd is None:
+            for file_to_read in files_to_read:
+                output[file_to_read] = self.read_file_if_exists(dir_to_read + "/" + file_to_read)
+            return output
+
+        try:
+            for file_to_read in files_to_read:
+                output[file_to_read] = self._read_file(dir_to_read + "/" + file_to_read, dir_fd=dir_fd, name=file_to_read)
+        finally:
+            os.close(dir_fd)
+
+        return output
+
+    @staticmethod
+    def _read_fd(fd):
+        # type: (int) -> str
+        # Unbuffered read, most of the files are sysfs attributes that fit into a single read
+        chunks = []
+        while True:
+            chunk = os.read(fd, 4096)
+            if not chunk:
+                break
+            chunks.append(chunk)
+
+        output = b"".join(chunks)
+        if sys.version_info.major == 3:
+            output = output.decode("utf-8")
+        return output
+
     def read_link_if_exists(self, link_to_read):
         # type: (str) -> str
         try:
             output = os.readlink(link_to_read)
         except OSError as exception:
             # if OSError: [Errno 2] No such file or directory
-            if exception.errno == 2:
+            if exception.errno == errno.ENOENT:
                 output = ""
             else:
                 raise exception
@@ -2447,35 +2876,55 @@ class DataSource(object):
 
     def list_dir_if_exists(self, dir_to_list):
         # type: (str) -> str
+        return " ".join(self._list_dir(dir_to_list))
+
+    def list_dir_entries(self, dir_to_list):
+        # type: (str) -> list
+        # Same as list_dir_if_exists, entries are returned as a list. Missing directory results in an empty list
+        if self._is_overridden("list_dir_if_exists"):
+            # i.e. debug data replay, provides the space joined entries only
+            return self.list_dir_if_exists(dir_to_list).split()
+        return self._list_dir(dir_to_list)
+
+    def _list_dir(self, dir_to_list):
+        # type: (str) -> list
         try:
             output = os.listdir(dir_to_list)
-            output = " ".join(output)
         except OSError as exception:
             # if OSError: [Errno 2] No such file or directory
-            if exception.errno == 2:
-                output = ""
+            if exception.errno == errno.ENOENT:
+                output = []
             else:
                 raise exception
 
         if self.config.record_data_for_debug is True:
             cmd = "os.listdir" + dir_to_list.rstrip('/') + "_dir"
-            self.record_data(cmd, output)
+            self.record_data(cmd, " ".join(output))
 
         return output
 
+    def _is_overridden(self, method_name):
+        # type: (str) -> bool
+        # Whether a subclass replaced one of the data retrieval methods
+        method = getattr(type(self), method_name)
+        base_method = getattr(DataSource, method_name)
+        return getattr(method, "__func__", method) is not getattr(base_method, "__func__", base_method)
+
     def exec_python_code(self, python_code, record_suffix="", use_cache=False):
         # type: (str, str, bool) -> str
-        cache_key = self.cmd_to_str(str(python_code) + str(record_suffix))
+        cache_key = str(python_code) + str(record_suffix)
 
-        if use_cache is True and cache_key in self.cache:
-            output = self.cache[cache_key]
-        else:
-            output = eval(python_code)
+        with self.cache_lock(cache_key, use_cache):
+            cache_hit = use_cache is True and cache_key in self.cache
+            if cache_hit:
+                output = self.cache[cache_key]
+            else:
+                output = eval(python_code)
 
-            if use_cache is True:
-                self.cache.update({cache_key: output})
+                if use_cache is True:
+                    self.cache.update({cache_key: output})
 
-        if self.config.record_data_for_debug is True:
+        if self.config.record_data_for_debug is True and not cache_hit:
             cmd = "os.python.code/" + hashlib.md5(python_code.encode('utf-8')).hexdigest() + record_suffix
             self.record_data(cmd, output)
 
@@ -2483,9 +2932,10 @@ class DataSource(object):
 
     def get_raw_socket_data(self, interface, ether_proto, capture_timeout, use_cache=True):
         # type: (str, int, int, bool) -> str
-        cache_key = self.cmd_to_str(str(interface) + str(ether_proto))
+        cache_key = str(interface) + str(ether_proto)
 
-        if use_cache is True and cache_key in self.cache:
+        cache_hit = use_cache is True and cache_key in self.cache
+        if cache_hit:
             output = self.cache[cache_key]
         else:
             try:
@@ -2520,8 +2970,8 @@ class DataSource(object):
             if use_cache is True:
                 self.cache.update({cache_key: output})
 
-        if self.config.record_data_for_debug is True:
-            cmd = "raw.socket.data/" + cache_key
+        if self.config.record_data_for_debug is True and not cache_hit:
+            cmd = "raw.socket.data/" + self.cmd_to_str(cache_key)
             self.record_data(cmd, output)
 
         return output
@@ -2558,6 +3008,7 @@ class DataSource(object):
     @staticmethod
     def cmd_to_str(cmd):
         # type: (str) -> str
+        # Used for recorded data names only, cache keys are the raw strings
         output = re.escape(cmd)
         return output
 
@@ -2574,25 +3025,56 @@ class BColors:
 
 
 def extract_string_by_regex(data_string, regex, na_string="=N/A="):
+    # type: (str, re.Pattern, str) -> str
     # The following will print first GROUP in the regex, thus grouping should be used
-    try:
-        search_result = re.search(regex, data_string).group(1)
-    except AttributeError:
-        search_result = na_string
+    # regex can be either a string or a precompiled pattern, precompiled one skips the re module cache lookup
+    if not hasattr(regex, "search"):
+        regex = re.compile(regex)
+
+    search_result = regex.search(data_string)
+    if search_result is None:
+        return na_string
+
+    return search_result.group(1)
+
+@lru_cache(maxsize=1024)
+def split_shell_free_cmd(cmd):
+    # type: (str) -> tuple
+    # Returns the argv of a cmd that doesn't need a shell to run, None if the cmd uses any shell syntax
+    if _RE_SHELL_FREE_CMD.match(cmd):
+        return tuple(cmd.split())
+
+    return None
+
+def convert_to_int(data_string, base=10, default=0):
+    # type: (str, int, object) -> object
+    # Converts sysfs values without raising, most of them are either valid numbers or empty strings
+    data_string = data_string.strip()
+    digits = data_string
+    if base == 16 and digits[:2] in ("0x", "0X"):
+        digits = digits[2:]
+
+    if digits and set(digits) <= _INT_DIGITS[base]:
+        return int(data_string, base)
 
-    return search_result
+    return default
 
 
 def find_in_list(list_to_search_in, regex_pattern, return_only_first_group=True):
     # type: (list, re.Pattern, bool) -> str
-    regex = re.compile(regex_pattern)
-    result = [m.group(0) for l in list_to_search_in for m in [regex.search(l)] if m]
+    # regex_pattern can be either a string or a precompiled pattern, same as in extract_string_by_regex
+    regex = regex_pattern
+    if not hasattr(regex, "search"):
+        regex = re.compile(regex)
+    matches = (m.group(0) for l in list_to_search_in for m in (regex.search(l),) if m)
 
+    if return_only_first_group:
+        # Stop scanning at the first match
+        return next(matches, "")
+
+    result = list(matches)
     if result:
-        if return_only_first_group:
-            return result[0]
-        else:
-            return result
+        return result
     else:
         return ""
 
@@ -2602,6 +3084,32 @@ def search_in_list_and_extract_by_regex(data_list, search_regex, output_regex):
     regex_search_result = extract_string_by_regex(list_search_result, output_regex)
     return str(regex_search_result).strip()
 
+def find_in_list_by_groups(list_to_search_in, regex):
+    # type: (list, re.Pattern) -> dict
+    # Same as find_in_list for several patterns in a single scan. regex is an alternation with a named group per pattern,
+    # returns {group name: first match} for every group that matched
+    result = {}
+    for line in list_to_search_in:
+        match = regex.search(line)
+        if match is None:
+            continue
+        for name, value in match.groupdict().items():
+            if value is not None and name not in result:
+                result[name] = value
+        if len(result) == len(regex.groupindex):
+            break
+
+    return result
+
+def search_in_list_and_extract_by_regexes(data_list, search_regex, output_regexes):
+    # type: (list, re.Pattern, dict) -> dict
+    # Same as search_in_list_and_extract_by_regex for several fields, output_regexes is {group name: output regex}
+    list_search_result = find_in_list_by_groups(data_list, search_regex)
+    regex_search_result = {}
+    for name, output_regex in output_regexes.items():
+        regex_search_result[name] = str(extract_string_by_regex(list_search_result.get(name, ""), output_regex)).strip()
+    return regex_search_result
+
 def humanize_number(num, precision=1):
     # type: (int, int) -> str
     abbrevs = (